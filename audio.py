@@ -0,0 +1,38 @@
+import os
+import sys
+import pygame
+
+AUDIO_DIR = os.path.join(getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__))), "audio")
+
+# cue name -> file in the audio folder
+CUE_FILES = {
+    "INITIALIZE": "initialize.mp3",
+    "CONFIRM": "Confirm.mp3",
+    "FLOOR_CHANGE_1X": "Floor_Change_1x.mp3",
+    "FLOOR_CHANGE_10X": "Floor_Change_10x.mp3",
+}
+
+# Decodes every cue once at startup and plays them on a small pool of mixer channels. Playing only hands the
+# already decoded sound to a free channel (or preempts the oldest one) so it returns immediately, back-to-back
+# cues overlap instead of restarting a single music stream, and a missing or broken file fails here and not
+# in the middle of an interaction
+class AudioCache:
+    def __init__(self, cue_files=CUE_FILES, audio_dir=AUDIO_DIR, channels=4):
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        pygame.mixer.set_num_channels(channels)
+
+        self.sounds = {}
+        for cue, file_name in cue_files.items():
+            path = os.path.join(audio_dir, file_name)
+            try:
+                self.sounds[cue] = pygame.mixer.Sound(path)
+            except (pygame.error, FileNotFoundError) as e:
+                raise RuntimeError(f"Could not load audio cue {cue} from {path}: {e}") from e
+
+    def play(self, cue):
+        try:
+            channel = pygame.mixer.find_channel(True)
+            channel.play(self.sounds[cue])
+        except pygame.error as e:
+            print(f"Error playing audio: {e}")
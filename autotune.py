@@ -0,0 +1,220 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+
+# Picks the MediaPipe Hands settings for the machine it runs on. Every profile of a grid (model complexity, capture
+# resolution, detection/tracking confidence) is run over the same frames, a recorded clip or synthetic frames, and
+# measured for fps, p95 per-frame latency and agreement with a reference profile (the most accurate one of the grid:
+# highest complexity, largest resolution, lowest confidences): the share of frames where both see the same gesture, or
+# both see no hand. The fastest profile whose agreement meets the accuracy floor is saved as JSON, and main.py loads it
+# at startup. Synthetic frames contain no hand, so with them only the speed is measured and nothing is saved.
+# Frames are read one by one for every profile, never held all at once (300 frames of 1280x720 are ~830 MB)
+#
+# NumPy, cv2 and MediaPipe are imported inside the functions that need them, so main.py can load a profile before
+# the window opens without waiting for them
+
+# next to the executable of the PyInstaller build (its bundle directory is a temporary unpack recreated on every
+# launch), or next to the scripts, so it does not depend on the working directory main.py is started from
+PROFILE_DIR = (os.path.dirname(sys.executable) if getattr(sys, 'frozen', False)
+               else os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PROFILE_PATH = os.path.join(PROFILE_DIR, "inference_profile.json")
+
+# settings main.py uses when there is no profile
+DEFAULT_PROFILE = {
+    "hands_options": {"model_complexity": 1, "min_detection_confidence": 0.5, "min_tracking_confidence": 0.5},
+    "capture": None,
+}
+
+
+# the saved profile, or the defaults when the file does not exist
+def load_profile(path=DEFAULT_PROFILE_PATH):
+    if not path or not os.path.exists(path):
+        return DEFAULT_PROFILE
+    with open(path) as f:
+        profile = json.load(f)
+    return {"hands_options": {**DEFAULT_PROFILE["hands_options"], **profile.get("hands_options", {})},
+            "capture": profile.get("capture")}
+
+# asks the camera for the profile's resolution, cameras that cannot do it keep whatever they negotiate
+def apply_capture(cap, profile):
+    import cv2
+    capture = profile.get("capture")
+    if capture:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, capture["width"])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, capture["height"])
+
+
+def profile_grid(complexities, resolutions, confidences):
+    return [{
+        "hands_options": {"model_complexity": complexity, "min_detection_confidence": confidence,
+                          "min_tracking_confidence": confidence},
+        "capture": {"width": width, "height": height},
+    } for complexity, (width, height), confidence in itertools.product(complexities, resolutions, confidences)]
+
+# the most accurate profile of the grid, its gestures are the reference the others are compared with
+def reference_profile(grid):
+    return max(grid, key=lambda profile: (profile["hands_options"]["model_complexity"],
+                                          profile["capture"]["width"] * profile["capture"]["height"],
+                                          -profile["hands_options"]["min_detection_confidence"]))
+
+def profile_name(profile):
+    options = profile["hands_options"]
+    capture = profile["capture"]
+    return (f"complexity {options['model_complexity']}, {capture['width']}x{capture['height']}, "
+            f"confidence {options['min_detection_confidence']}")
+
+
+# yields up to max_frames BGR frames of a video file, or synthetic noise frames when path is None. Every call starts
+# over from the first frame (the same seed gives the same synthetic frames), so each profile sees the same frames
+def read_frames(path=None, max_frames=300, size=(1280, 720), seed=0):
+    import numpy as np
+    if path is None:
+        rng = np.random.default_rng(seed)
+        for _ in range(max_frames):
+            yield rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)
+        return
+    import cv2
+    cap = cv2.VideoCapture(path)
+    try:
+        for _ in range(max_frames):
+            success, image = cap.read()
+            if not success:
+                break
+            yield image
+    finally:
+        cap.release()
+
+# (width, height) of the frames read_frames yields
+def frame_size(path=None, size=(1280, 720)):
+    first = next(read_frames(path, max_frames=1, size=size), None)
+    if first is None:
+        raise SystemExit(f"could not read any frames from {path}")
+    return first.shape[1], first.shape[0]
+
+# runs the frames through one profile the way main.py does (flip, RGB, infer, classify) with the same max_hands.
+# Frames are scaled to the capture size first, outside the timing, as a camera would deliver them at that size.
+# Returns the per-frame latencies in seconds and a (frames, max_hands) array of the gesture codes of every frame,
+# sorted since MediaPipe returns the hands in no particular order and padded with -1 for missing hands
+def run_profile(profile, frames, margin=0.05, max_hands=1):
+    import cv2
+    import mediapipe as mp
+    import numpy as np
+    from hand import classify_landmarks, landmarks_to_array
+
+    size = (profile["capture"]["width"], profile["capture"]["height"])
+    hands = mp.solutions.hands.Hands(max_num_hands=max_hands, **profile["hands_options"])
+    latencies = []
+    codes = []
+    try:
+        # the first inferences include the graph start up, they are run on blank frames and not timed
+        blank = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+        for _ in range(3):
+            hands.process(blank)
+        for image in frames:
+            if (image.shape[1], image.shape[0]) != size:
+                image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+            started = time.perf_counter()
+            results = hands.process(cv2.cvtColor(cv2.flip(image, 1), cv2.COLOR_BGR2RGB))
+            frame_codes = [-1] * max_hands
+            if results.multi_hand_landmarks:
+                landmarks = np.stack([landmarks_to_array(hand) for hand in results.multi_hand_landmarks])
+                found = sorted(int(code) for code in classify_landmarks(landmarks, margin))
+                frame_codes[:len(found)] = found
+            codes.append(frame_codes)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        hands.close()
+    return np.array(latencies), np.array(codes)
+
+
+# benchmarks every profile and returns their measurements, the reference first. open_frames returns a fresh
+# iterator over the same frames for every profile. Profiles larger than the frames (width, height) are skipped, a
+# camera delivering them would be upscaled and the measurement would mean nothing
+def tune(open_frames, size, grid, margin=0.05, max_hands=1):
+    import numpy as np
+    width, height = size
+    grid = [profile for profile in grid if profile["capture"]["width"] <= width and profile["capture"]["height"] <= height]
+    if not grid:
+        raise SystemExit(f"every profile is larger than the {width}x{height} frames")
+    reference = reference_profile(grid)
+    reference_run = run_profile(reference, open_frames(), margin, max_hands)
+    reference_codes = reference_run[1]
+
+    measurements = []
+    for profile in [reference] + [profile for profile in grid if profile is not reference]:
+        latencies, codes = reference_run if profile is reference else run_profile(profile, open_frames(), margin,
+                                                                                  max_hands)
+        measurements.append({
+            **profile,
+            "name": profile_name(profile),
+            "fps": len(latencies) / latencies.sum(),
+            "p95_ms": float(np.percentile(latencies, 95) * 1000),
+            "agreement": float(np.mean((codes == reference_codes).all(axis=1))),
+            "hand_frames": int(np.sum((codes >= 0).any(axis=1))),
+        })
+        print(f"{measurements[-1]['name']}: {measurements[-1]['fps']:.1f} fps, p95 {measurements[-1]['p95_ms']:.1f} ms, "
+              f"agreement {measurements[-1]['agreement']:.3f}")
+    return measurements
+
+# the fastest measured profile that agrees with the reference on at least accuracy_floor of the frames
+def choose_profile(measurements, accuracy_floor=0.95):
+    eligible = [measurement for measurement in measurements if measurement["agreement"] >= accuracy_floor]
+    return max(eligible, key=lambda measurement: measurement["fps"])
+
+def save_profile(measurement, path, source, max_hands=1):
+    profile = {
+        "hands_options": measurement["hands_options"],
+        "capture": measurement["capture"],
+        "measured": {"fps": measurement["fps"], "p95_ms": measurement["p95_ms"], "agreement": measurement["agreement"],
+                     "source": source, "max_hands": max_hands, "machine": platform.node(),
+                     "processor": platform.processor(),
+                     "tuned_at": time.strftime("%Y-%m-%d %H:%M:%S")},
+    }
+    with open(path, "w") as f:
+        json.dump(profile, f, indent=2)
+
+
+def parse_resolution(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the fastest hand model settings for this machine")
+    parser.add_argument("clip", nargs="?",
+                        help="recorded video with gestures. Without one synthetic frames are timed and nothing is saved")
+    parser.add_argument("--output", default=DEFAULT_PROFILE_PATH, help="where to save the chosen profile")
+    parser.add_argument("--complexities", type=int, nargs="+", default=[0, 1])
+    parser.add_argument("--resolutions", type=parse_resolution, nargs="+",
+                        default=[(640, 360), (960, 540), (1280, 720)], help="capture sizes as WIDTHxHEIGHT")
+    parser.add_argument("--confidences", type=float, nargs="+", default=[0.5, 0.7],
+                        help="detection and tracking confidence thresholds")
+    parser.add_argument("--accuracy-floor", type=float, default=0.95,
+                        help="minimum share of frames agreeing with the reference profile")
+    parser.add_argument("--max-frames", type=int, default=300)
+    parser.add_argument("--max-hands", type=int, default=1, help="the --max-hands main.py runs with")
+    parser.add_argument("--margin", type=float, default=0.05)
+    parser.add_argument("--report", help="also write every profile's measurements as JSON here")
+    args = parser.parse_args()
+
+    if args.clip is None:
+        print("no clip given, timing synthetic frames without hands: only the speed is compared")
+    measurements = tune(lambda: read_frames(args.clip, args.max_frames), frame_size(args.clip),
+                        profile_grid(args.complexities, args.resolutions, args.confidences), args.margin, args.max_hands)
+    chosen = choose_profile(measurements, args.accuracy_floor)
+    # without hands in the frames every profile agrees, the choice would ignore accuracy
+    if args.clip is None:
+        print(f"fastest: {chosen['name']}, not saved, pass a recorded clip with gestures to save a profile")
+    else:
+        save_profile(chosen, args.output, args.clip, args.max_hands)
+        print(f"saved {chosen['name']} to {args.output}")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"chosen": chosen["name"], "profiles": measurements}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import argparse
+import json
+import sys
+import time
+from types import SimpleNamespace
+import numpy as np
+from gesture_handler import GestureHandler
+from hand import GESTURE_NAMES, Hand
+
+# Headless microbenchmarks of the per-frame hot paths, on synthetic MediaPipe-shaped hands, so no camera, display or
+# audio device is needed. Every benchmark is timed in rounds of many calls and reports the per-call median and p95 in
+# microseconds. A benchmark whose median is above its budget fails the run (exit status 1), budgets are generous
+# enough for a slow CI box and can be scaled with --budget-scale. The Tk conversions (PhotoImage and the real
+# ElevatorUI fast render path on a withdrawn window) need a display and are skipped without one
+
+# per-call median budget of every benchmark in microseconds
+BUDGETS = {
+    "hand_predicates": 50,
+    "recognize_gesture": 50,
+    "recognize_gesture_jittered": 50,
+    "recognize_gestures_batch_per_hand": 10,
+    "handle_gesture_dwell": 30,
+    "draw_detection_box_1280x720": 400,
+    "update_video_fromarray_1280x720": 5000,
+    # ElevatorUI._paste_video: INTER_LINEAR resize to the window size, frombytes and the Tk paste
+    "update_video_fast_render_1280x720": 10000,
+    "update_video_photoimage_1280x720": 40000,
+}
+
+MARGIN = 0.05
+WRIST = (0.5, 0.8)
+
+# y of mcp, pip, dip and tip relative to the wrist for a straight finger pointing up, a curled finger, and a finger
+# bent so far that its joints are at nearly the same height (the ambiguous case the strict chains trip over)
+STRAIGHT = (-0.18, -0.28, -0.34, -0.39)
+CURLED = (-0.18, -0.14, -0.10, -0.12)
+BENT = (-0.18, -0.185, -0.18, -0.175)
+
+# which fingers (index, middle, ring, pinky) are straight, and whether the hand points down, for every gesture
+POSES = {
+    "All Fingers Pointing Up": ((True, True, True, True), False),
+    "All Fingers Pointing Down": ((True, True, True, True), True),
+    "Victory (OK)": ((True, True, False, False), False),
+    "Index Finger Pointing Up": ((True, False, False, False), False),
+    "Index Finger Pointing Down": ((True, False, False, False), True),
+    "Neutral": ((False, False, False, False), False),
+}
+
+
+# (21, 3) landmarks for a gesture, bent_finger replaces one finger by an ambiguous bent one
+def pose_landmarks(gesture, bent_finger=None):
+    straight, pointing_down = POSES[gesture]
+    landmarks = np.zeros((21, 3))
+    for joint in range(1, 5):
+        landmarks[joint] = (-0.15, -0.1 - 0.03 * joint, -0.01 * joint)
+    for finger, is_straight in enumerate(straight):
+        heights = BENT if finger == bent_finger else STRAIGHT if is_straight else CURLED
+        for joint, height in enumerate(heights):
+            landmarks[5 + 4 * finger + joint] = (-0.08 + 0.05 * finger, height, -0.02 * joint)
+    if pointing_down:
+        landmarks[:, 1] *= -1
+    landmarks[:, :2] += WRIST
+    return landmarks
+
+def jittered(landmarks, rng, sigma=0.004):
+    return landmarks + rng.normal(0, sigma, landmarks.shape) * (1, 1, 0.5)
+
+# wraps a (21, 3) array in an object shaped like MediaPipe's NormalizedLandmarkList (hand.landmark[i].x / .y / .z)
+def mediapipe_hand(landmarks):
+    return SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=z) for x, y, z in landmarks])
+
+# clean, jittered and ambiguous MediaPipe-shaped hands of every gesture
+def synthetic_hands(rng, jittered_per_gesture=20):
+    hands = {"clean": {}, "jittered": {}, "ambiguous": {}}
+    for gesture in GESTURE_NAMES:
+        clean = pose_landmarks(gesture)
+        hands["clean"][gesture] = mediapipe_hand(clean)
+        hands["jittered"][gesture] = [mediapipe_hand(jittered(clean, rng)) for _ in range(jittered_per_gesture)]
+        hands["ambiguous"][gesture] = [mediapipe_hand(pose_landmarks(gesture, bent_finger=finger)) for finger in range(4)]
+    return hands
+
+# the clean synthetic poses have to be recognized as the gesture they were built for, or the timings mean nothing
+def check_poses(hands):
+    handler = GestureHandler(MARGIN, mute=True)
+    wrong = {gesture: handler.recognize_gesture(hand) for gesture, hand in hands["clean"].items()
+             if handler.recognize_gesture(hand) != gesture}
+    if wrong:
+        raise SystemExit(f"synthetic poses are recognized wrong: {wrong}")
+
+
+# calls function(item) for every item, rounds times, and returns per-call statistics in microseconds
+def time_calls(function, items, rounds=30):
+    per_call = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for item in items:
+            function(item)
+        per_call.append((time.perf_counter() - started) / len(items) * 1e6)
+    return call_stats(per_call, len(items) * rounds)
+
+def call_stats(per_call, calls):
+    per_call = np.array(per_call)
+    return {"p50_us": float(np.median(per_call)), "p95_us": float(np.percentile(per_call, 95)), "calls": calls}
+
+
+def bench_hand_predicates(hands):
+    def predicates(hand_landmarks):
+        hand = Hand(hand_landmarks, MARGIN)
+        hand.all_fingers_up_except_thumb()
+        hand.all_fingers_down_except_thumb()
+        hand.victory_gesture()
+        hand.finger_up("INDEX_FINGER")
+        hand.finger_down("INDEX_FINGER")
+    return time_calls(predicates, list(hands["clean"].values()))
+
+def bench_recognize_gesture(hands, variant):
+    handler = GestureHandler(MARGIN, mute=True)
+    items = list(hands[variant].values())
+    if variant != "clean":
+        items = [hand for group in items for hand in group]
+    return time_calls(handler.recognize_gesture, items)
+
+def bench_recognize_gestures_batch(hands, batch_size=64):
+    handler = GestureHandler(MARGIN, mute=True)
+    flat = [hand for group in hands["jittered"].values() for hand in group]
+    batch = np.array([[(landmark.x, landmark.y, landmark.z) for landmark in hand.landmark] for hand in flat[:batch_size]])
+    result = time_calls(handler.recognize_gestures, [batch])
+    # reported per hand so the budget does not depend on the batch size
+    return {**result, "p50_us": result["p50_us"] / len(batch), "p95_us": result["p95_us"] / len(batch)}
+
+# a selection at 30 fps: peace sign, index up for 3 floors, a short flicker, peace sign. The clock keeps running
+# across rounds so the dwell sees one continuous session. Every round has to confirm its floor, or the timings are of
+# a broken state machine
+def bench_handle_gesture(rounds=10, floors_per_round=3):
+    sequence = ["Victory (OK)"] * 35 + ["Index Finger Pointing Up"] * 60 + ["Neutral"] * 5 + ["Victory (OK)"] * 35
+    handler = GestureHandler(MARGIN, mute=True)
+    timestamp = 0.0
+    per_call = []
+    confirmed = 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for gesture in sequence:
+            timestamp += 1 / 30
+            handler.process_gesture(gesture, timestamp)
+            if handler.last_event is not None and handler.last_event["kind"] == "floor_confirmed":
+                confirmed += 1
+        per_call.append((time.perf_counter() - started) / len(sequence) * 1e6)
+    if confirmed != rounds or handler.current_floor != rounds * floors_per_round:
+        raise SystemExit(f"the selection sequence confirmed {confirmed} of {rounds} selections and ended on floor "
+                         f"{handler.current_floor} instead of {rounds * floors_per_round}")
+    return {**call_stats(per_call, len(sequence) * rounds), "floors_confirmed": confirmed}
+
+def bench_draw_detection_box(hands, frame):
+    from overlay import STATE_CONFIG, draw_detection_box
+    landmarks = [np.array([(landmark.x, landmark.y, landmark.z) for landmark in hands["clean"]["Victory (OK)"].landmark])]
+    config = STATE_CONFIG["Victory (OK)"]
+    image = frame.copy()
+
+    def draw(show_floor):
+        draw_detection_box(landmarks, image, config["box_color"], config["label_text"], 12,
+                           show_floor=show_floor, initializing=not show_floor)
+    return time_calls(draw, [False, True] * 10)
+
+def bench_update_video(frame, display_size=(960, 540)):
+    from PIL import Image
+    results = {"update_video_fromarray_1280x720": time_calls(Image.fromarray, [frame], rounds=20)}
+
+    try:
+        from PIL import ImageTk
+        from UI import ElevatorUI
+        # no display refresh cap, every frame is rendered
+        ui = ElevatorUI(fast_render=True, max_display_fps=0)
+    except Exception as e:
+        for name in ("update_video_fast_render_1280x720", "update_video_photoimage_1280x720"):
+            results[name] = {"skipped": f"no display: {e}"}
+        return results
+    try:
+        ui.root.withdraw()
+        # a withdrawn window has no size, render at the size the 1024x768 window gives the video
+        ui._fit_to_container = lambda width, height: display_size
+        results["update_video_fast_render_1280x720"] = time_calls(ui._paste_video, [frame], rounds=20)
+        results["update_video_photoimage_1280x720"] = time_calls(
+            lambda image: ImageTk.PhotoImage(image=Image.fromarray(image)), [frame], rounds=10)
+    finally:
+        ui.root.destroy()
+    return results
+
+
+def run_benchmarks(seed=0):
+    rng = np.random.default_rng(seed)
+    hands = synthetic_hands(rng)
+    check_poses(hands)
+    frame = rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+
+    results = {
+        "hand_predicates": bench_hand_predicates(hands),
+        "recognize_gesture": bench_recognize_gesture(hands, "clean"),
+        "recognize_gesture_jittered": bench_recognize_gesture(hands, "jittered"),
+        "recognize_gestures_batch_per_hand": bench_recognize_gestures_batch(hands),
+        "handle_gesture_dwell": bench_handle_gesture(),
+        "draw_detection_box_1280x720": bench_draw_detection_box(hands, frame),
+    }
+    results.update(bench_update_video(frame))
+
+    # what the ambiguous hands are recognized as, to spot classifier changes next to the timings
+    handler = GestureHandler(MARGIN, mute=True)
+    ambiguous = {gesture: [handler.recognize_gesture(hand) for hand in group]
+                 for gesture, group in hands["ambiguous"].items()}
+    return results, ambiguous
+
+def check_budgets(results, budget_scale=1.0):
+    passed = True
+    for name, result in results.items():
+        if "skipped" in result:
+            continue
+        result["budget_us"] = BUDGETS[name] * budget_scale
+        result["ok"] = result["p50_us"] <= result["budget_us"]
+        passed = passed and result["ok"]
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless microbenchmarks of the per-frame hot paths with budgets")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="multiply every budget, e.g. 2 on slow machines")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results, ambiguous = run_benchmarks(args.seed)
+    passed = check_budgets(results, args.budget_scale)
+    report = {"passed": passed, "budget_scale": args.budget_scale, "benchmarks": results, "ambiguous": ambiguous}
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    if not passed:
+        failed = [name for name, result in results.items() if result.get("ok") is False]
+        print(f"over budget: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import argparse
+import json
+import time
+import numpy as np
+from gesture_model import accuracy_by_gesture, train_model
+from hand import GESTURE_NAMES, classify_landmarks
+from recording import SessionRecorder, open_session
+
+# Builds a gesture model for one installation. Without --sessions it walks the person calibrating through every
+# gesture in front of the camera and records the labelled frames to a session file (the gesture field holds the label),
+# then trains on them. Existing labelled sessions can be passed with --sessions instead, e.g. to retrain with another
+# model kind. The last --holdout share of every gesture's frames is kept out of training to report the accuracy, the
+# saved model is then trained on all frames
+
+PROMPTS = {
+    "Neutral": "Relax your hand, move it around",
+}
+
+
+# records the prompted gestures to path, replacing what is there unless append is set
+def record_calibration(path, seconds=5.0, countdown=3.0, camera=0, append=False):
+    import cv2
+    import mediapipe as mp
+
+    cap = cv2.VideoCapture(camera)
+    hands = mp.solutions.hands.Hands(max_num_hands=1)
+    recorder = SessionRecorder(path, append=append)
+    try:
+        for gesture in GESTURE_NAMES:
+            prompt = PROMPTS.get(gesture, f"Show: {gesture}")
+            started = time.monotonic()
+            while time.monotonic() - started < countdown + seconds:
+                success, image = cap.read()
+                if not success:
+                    continue
+                # same mirrored image main.py feeds the model
+                image = cv2.flip(image, 1)
+                results = hands.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+                elapsed = time.monotonic() - started
+                recording = elapsed >= countdown
+                if recording and results.multi_hand_landmarks:
+                    handedness = results.multi_handedness[0].classification[0].label
+                    recorder.write(time.monotonic(), results.multi_hand_landmarks[0], handedness, gesture)
+
+                status = "recording" if recording else f"starting in {countdown - elapsed:.0f}"
+                cv2.putText(image, prompt, (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
+                cv2.putText(image, status, (20, 80), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255) if recording else (255, 255, 255), 2)
+                cv2.imshow("Calibration", image)
+                if cv2.waitKey(1) & 0xFF == 27:
+                    raise SystemExit("calibration aborted")
+    finally:
+        recorder.close()
+        hands.close()
+        cap.release()
+        cv2.destroyAllWindows()
+
+
+# concatenates the landmarks and gesture labels of several session files
+def load_labelled(paths):
+    records = [open_session(path) for path in paths]
+    landmarks = np.concatenate([np.asarray(r["landmarks"], dtype=np.float64) for r in records])
+    labels = np.concatenate([np.asarray(r["gesture"], dtype=np.int64) for r in records])
+    keep = (labels >= 0) & ~np.isnan(landmarks).any(axis=(1, 2))
+    return landmarks[keep], labels[keep]
+
+# boolean mask of the frames held out for evaluation: the last fraction of every gesture's frames
+def holdout_mask(labels, fraction):
+    mask = np.zeros(len(labels), dtype=bool)
+    for code in np.unique(labels):
+        indices = np.flatnonzero(labels == code)
+        mask[indices[len(indices) - int(len(indices) * fraction):]] = True
+    return mask
+
+
+def calibrate(landmarks, labels, kind="softmax", holdout=0.2, margin=0.05):
+    test = holdout_mask(labels, holdout)
+    report = {"frames": int(len(labels)), "kind": kind}
+    if test.any() and (~test).any():
+        model = train_model(landmarks[~test], labels[~test], kind)
+        report["holdout_accuracy"] = accuracy_by_gesture(model.predict_codes(landmarks[test]), labels[test])
+        # how well the hand-written finger rules do on the same frames, for comparison
+        report["rules_accuracy"] = accuracy_by_gesture(classify_landmarks(landmarks[test], margin), labels[test])
+    model = train_model(landmarks, labels, kind)
+    report["training_accuracy"] = accuracy_by_gesture(model.predict_codes(landmarks), labels)
+    return model, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record labelled gestures and train a gesture model for this camera")
+    parser.add_argument("--output", default="gesture_model.npz", help="where to save the trained model")
+    parser.add_argument("--kind", choices=("softmax", "centroid"), default="softmax")
+    parser.add_argument("--sessions", nargs="+", help="train on these labelled session files instead of recording")
+    parser.add_argument("--record", default="calibration.lmk",
+                        help="session file the calibration frames are saved to, an existing one is overwritten")
+    parser.add_argument("--append", action="store_true",
+                        help="add the new frames to the --record file instead, e.g. a second person calibrating")
+    parser.add_argument("--seconds", type=float, default=5.0, help="recording time per gesture")
+    parser.add_argument("--camera", type=int, default=0)
+    parser.add_argument("--holdout", type=float, default=0.2, help="share of each gesture's frames used for evaluation")
+    args = parser.parse_args()
+
+    sessions = args.sessions
+    if not sessions:
+        record_calibration(args.record, seconds=args.seconds, camera=args.camera, append=args.append)
+        sessions = [args.record]
+
+    landmarks, labels = load_labelled(sessions)
+    model, report = calibrate(landmarks, labels, args.kind, args.holdout)
+    model.save(args.output)
+    report["model"] = args.output
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
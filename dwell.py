@@ -0,0 +1,63 @@
+# Run-length dwell state machine shared by every gesture. Only one gesture can be building up at a time: seeing a
+# different tracked gesture restarts the run for the new one, and a run is dropped once gap_tolerance_ms passes without
+# a sample of it (untracked frames such as "Neutral", or no hand at all). gap_tolerance_ms has to be longer than the
+# frame interval. Every update and threshold check is constant time.
+# Thresholds are milliseconds measured on monotonic frame timestamps (seconds, e.g. time.monotonic()) so the
+# confirmation latency is the same on a 60 fps laptop and a 12 fps kiosk. min_samples guards against a run of
+# two frames far apart in time confirming a gesture on a badly stalled machine
+class DwellTracker:
+    def __init__(self, thresholds_ms, min_samples=1, gap_tolerance_ms=250):
+        # gesture name -> milliseconds it has to be held
+        self.thresholds_ms = dict(thresholds_ms)
+        self.min_samples = min_samples
+        self.gap_tolerance_ms = gap_tolerance_ms
+        self.reset()
+
+    def reset(self):
+        self.gesture = None
+        self.count = 0
+        self.started = None
+        self.last_seen = None
+        self.elapsed_ms = 0.0
+
+    # feeds one frame's gesture, returns a decision event dict once the current gesture has been held long enough.
+    # With confirm=False a run that reached its threshold is kept alive at it instead of firing and starting over, the
+    # next update with confirm fires right away
+    def update(self, gesture, timestamp, confirm=True):
+        threshold_ms = self.thresholds_ms.get(gesture)
+        if threshold_ms is None:
+            if self.gesture is not None and self.gap_exceeded(timestamp):
+                self.reset()
+            return None
+
+        if gesture != self.gesture or self.gap_exceeded(timestamp):
+            self.gesture = gesture
+            self.count = 0
+            self.started = timestamp
+        self.count += 1
+        self.last_seen = timestamp
+        self.elapsed_ms = (timestamp - self.started) * 1000
+
+        if self.elapsed_ms >= threshold_ms and self.count >= self.min_samples and confirm:
+            event = {
+                "gesture": gesture,
+                "started": self.started,
+                "timestamp": timestamp,
+                "elapsed_ms": self.elapsed_ms,
+                "samples": self.count,
+            }
+            self.reset()
+            return event
+        return None
+
+    def gap_exceeded(self, timestamp):
+        return self.last_seen is not None and (timestamp - self.last_seen) * 1000 > self.gap_tolerance_ms
+
+    # how far the current gesture is towards its threshold, between 0 and 1
+    def progress(self):
+        if self.gesture is None:
+            return 0.0
+        threshold_ms = self.thresholds_ms[self.gesture]
+        if threshold_ms <= 0:
+            return 1.0
+        return min(self.elapsed_ms / threshold_ms, 1.0)
@@ -1,13 +1,36 @@
-import os
-import sys
-import pygame
-from hand import Hand
+import time
+from dwell import DwellTracker
+from hand import Hand, classify_landmarks, landmarks_to_array
 
-INITIALIZE_CHANGE_AUDIO_PATH = os.path.join(getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__))), "audio/Initialize.mp3")
+# audio cue names, see audio.CUE_FILES
+INITIALIZE_CUE = "INITIALIZE"
+CONFIRM_CUE = "CONFIRM"
+FLOOR_CHANGE_1X_CUE = "FLOOR_CHANGE_1X"
+FLOOR_CHANGE_10X_CUE = "FLOOR_CHANGE_10X"
+
+# How long the peace sign has to be held to open the floor selection
+INITIAL_VICTORY_MS = 1000
 
 class GestureHandler:
-    def __init__(self, margin):
+    def __init__(self, margin, dwell_ms=None, min_samples=3, gap_tolerance_ms=250, audio=None, mute=False,
+                 landmark_filter=None, hysteresis=0.0, classifier=None):
         self.margin = margin
+        # optional trained gesture_model.GestureModel used instead of the finger rules in hand.py
+        self.classifier = classifier
+        # optional smoothing.ExponentialFilter / OneEuroFilter run on the landmarks before they are classified, and
+        # the hysteresis on the finger tests (see hand.fingers_pointing), both cut single frame "Neutral" flickers
+        self.landmark_filter = landmark_filter
+        self.hysteresis = hysteresis
+        self.gap_tolerance_ms = gap_tolerance_ms
+        # last frame's finger states and time, the hysteresis only applies to the frame right after them
+        self.previous_fingers = None
+        self.previous_fingers_time = None
+        # preloaded audio.AudioCache used to play the cues, without one (or with mute) the handler runs silent
+        # so it can run headless (replays, benchmarks, CI)
+        self.audio = audio
+        self.mute = mute
+        # the decision event produced by the last process_gesture call, or None
+        self.last_event = None
         self.gesture_counter = 0
         self.initial_victory_counter = 0
         self.initializing = True
@@ -15,84 +38,148 @@ class GestureHandler:
         self.is_first_initialization = True
         self.just_initialized = False
 
-        # Gesture data definitions   (name of the sign - number of frames that is has to remain active for the program to accept it 
+        # Gesture data definitions   (name of the sign - number of milliseconds that is has to remain active for the program to accept it 
         # - numbers of floors it changes each time you detect it - wether or not it can change the current floor)
-        self.victory_gesture_data = self.handle_gesture_counter("Victory (OK)", 30, 0, update_floor=True)
-        self.all_fingers_up_data = self.handle_gesture_counter("All Fingers Pointing Up", 20, 10)
-        self.all_fingers_down_data = self.handle_gesture_counter("All Fingers Pointing Down", 20, -10)
-        self.index_finger_up_data = self.handle_gesture_counter("Index Finger Pointing Up", 15, 1)
-        self.index_finger_down_data = self.handle_gesture_counter("Index Finger Pointing Down", 15, -1)
+        self.victory_gesture_data = self.handle_gesture_counter("Victory (OK)", 1000, 0, update_floor=True)
+        self.all_fingers_up_data = self.handle_gesture_counter("All Fingers Pointing Up", 650, 10)
+        self.all_fingers_down_data = self.handle_gesture_counter("All Fingers Pointing Down", 650, -10)
+        self.index_finger_up_data = self.handle_gesture_counter("Index Finger Pointing Up", 500, 1)
+        self.index_finger_down_data = self.handle_gesture_counter("Index Finger Pointing Down", 500, -1)
+
+        # dwell_ms overrides the hold time of any gesture by name, e.g. {"Victory (OK)": 400}
+        self.gesture_data = [self.victory_gesture_data, self.all_fingers_up_data, self.all_fingers_down_data,
+                             self.index_finger_up_data, self.index_finger_down_data]
+        for data in self.gesture_data:
+            data["threshold"] = (dwell_ms or {}).get(data["gesture_name"], data["threshold"])
+
+        # one dwell state machine for all gestures, switching gestures restarts the count and up to
+        # gap_tolerance_ms of unrecognized frames (or no hand) are forgiven before the count is dropped
+        self.dwell = DwellTracker({data["gesture_name"]: data["threshold"] for data in self.gesture_data},
+                                  min_samples=min_samples, gap_tolerance_ms=gap_tolerance_ms)
+        initial_victory_ms = (dwell_ms or {}).get("initializing", INITIAL_VICTORY_MS)
+        self.initial_dwell = DwellTracker({"Victory (OK)": initial_victory_ms}, min_samples=min_samples,
+                                          gap_tolerance_ms=gap_tolerance_ms)
 
     #This has to recognize gestures in this order otherwise the app will break DO NOT TOUCH
-    def recognize_gesture(self, hand_landmarks):
-        hand = Hand(hand_landmarks, self.margin)
-
-        if hand.all_fingers_up_except_thumb():
-            return "All Fingers Pointing Up"
-        elif hand.all_fingers_down_except_thumb():
-            return "All Fingers Pointing Down"
-        elif hand.victory_gesture():
-            return "Victory (OK)"
-        elif hand.finger_up('INDEX_FINGER'):
-            return "Index Finger Pointing Up"
-        elif hand.finger_down('INDEX_FINGER'):
-            return "Index Finger Pointing Down"
-        else:
-            return "Neutral"
+    # (the order lives in hand.GESTURE_NAMES and is applied by hand.classify_fingers)
+    # timestamp (seconds, monotonic) is only used by the landmark filter and the hysteresis, it defaults to now
+    def recognize_gesture(self, hand_landmarks, timestamp=None):
+        if self.landmark_filter is None and not self.hysteresis and self.classifier is None:
+            return Hand(hand_landmarks, self.margin).gesture_name()
 
-    def play_audio(self, file_name):
-        try:
-            pygame.mixer.music.load(file_name)
-            pygame.mixer.music.play()
-        except pygame.error as e:
-            print(f"Error playing audio: {e}")
+        if timestamp is None:
+            timestamp = time.monotonic()
+        landmarks = landmarks_to_array(hand_landmarks)
+        if self.landmark_filter is not None:
+            landmarks = self.landmark_filter(landmarks, timestamp)
+        if self.classifier is not None:
+            return self.classifier.predict_name(landmarks)
+        if self.previous_fingers_time is not None and (timestamp - self.previous_fingers_time) * 1000 > self.gap_tolerance_ms:
+            self.previous_fingers = None
+        hand = Hand(landmarks, self.margin, self.hysteresis, self.previous_fingers)
+        self.previous_fingers = (hand.up, hand.down)
+        self.previous_fingers_time = timestamp
+        return hand.gesture_name()
+
+    # classifies an (N, 21, 3) stack of landmarks in one vectorized pass and returns N gesture codes,
+    # decode them with hand.GESTURE_NAMES
+    def recognize_gestures(self, landmarks):
+        if self.classifier is not None:
+            return self.classifier.predict_codes(landmarks)
+        return classify_landmarks(landmarks, self.margin)
+
+    def play_audio(self, cue):
+        if self.mute or self.audio is None:
+            return
+        self.audio.play(cue)
 
     def handle_gesture_counter(self, gesture_name, threshold, increment, update_floor=False):
         return {
-            "gesture_list": [],
             "gesture_name": gesture_name,
             "threshold": threshold,
             "increment": increment,
             "update_floor": update_floor
         }
 
-    def handle_gesture(self, gesture_data, audio_file):
-        gesture_list = gesture_data['gesture_list']
-        gesture_name = gesture_data['gesture_name']
-        threshold = gesture_data['threshold']
-        increment = gesture_data['increment']
-        update_floor = gesture_data['update_floor']
+    def handle_gesture(self, gesture_data, audio_cue, timestamp=None):
+        if timestamp is None:
+            timestamp = time.monotonic()
 
-        # as long as we can detect the gesture for each frame append to this list if it goes above threshold (speed) then we confirm its detection
-        gesture_list.append(gesture_name)
-        if len(gesture_list) > threshold:
-            gesture_list.pop(0)
+        # as long as we can detect the gesture for each frame the dwell tracker counts it, once it goes above threshold (speed) we confirm its detection
+        event = self.dwell.update(gesture_data['gesture_name'], timestamp)
+        if event is None:
+            return None
 
         # as long as we hit the threshold play its audio and increment gesture counter once done update floor if the gesture lets you change it.
         # If floor is changed it means elevator has moved and once again we need confirmation
-        if gesture_list.count(gesture_name) == threshold:
-            if update_floor:
-                self.current_floor += self.gesture_counter
-                self.gesture_counter = 0
-                self.initializing = True
-            else:
-                self.gesture_counter += increment
-            self.play_audio(audio_file)
-            gesture_list.clear()
+        if gesture_data['update_floor']:
+            self.current_floor += self.gesture_counter
+            self.gesture_counter = 0
+            self.initializing = True
+            event["kind"] = "floor_confirmed"
+        else:
+            self.gesture_counter += gesture_data['increment']
+            event["kind"] = "floor_changed"
+        self.play_audio(audio_cue)
+        event["current_floor"] = self.current_floor
+        event["predicted_floor"] = self.predicted_floor()
+        self.last_event = event
+        return event
 
     # the intilize state of the app is different thats why we handle this particular gesture a bit differently (it opens and closes the gesture logic rules)
-    def handle_initializing(self, gesture):
+    def handle_initializing(self, gesture, timestamp=None):
+        if timestamp is None:
+            timestamp = time.monotonic()
 
-        if gesture == "Victory (OK)":
-            self.initial_victory_counter += 1
-        else:
-            self.initial_victory_counter = 0
+        event = self.initial_dwell.update(gesture, timestamp)
+        self.initial_victory_counter = self.initial_dwell.count
 
-        if self.initial_victory_counter >= 30:
+        if event is not None:
             self.initializing = False
             self.initial_victory_counter = 0
             self.current_floor += self.gesture_counter
-            self.play_audio(INITIALIZE_CHANGE_AUDIO_PATH)
+            self.play_audio(INITIALIZE_CUE)
             self.is_first_initialization = False
             self.just_initialized = True
+            self.dwell.reset()
+            event["kind"] = "initialized"
+            event["current_floor"] = self.current_floor
+            event["predicted_floor"] = self.predicted_floor()
+            self.last_event = event
+
+    # feeds one recognized gesture into the state machine and returns the overlay state to draw and
+    # whether the predicted floor should be shown. During initialization only the peace sign counts
+    def process_gesture(self, gesture, timestamp=None):
+        self.last_event = None
+        if self.initializing:
+            self.handle_initializing(gesture, timestamp)
+            if gesture == "Victory (OK)":
+                return "Victory (OK)", False
+            return "idle", False
+
+        if gesture == "All Fingers Pointing Up":
+            self.handle_gesture(self.all_fingers_up_data, FLOOR_CHANGE_10X_CUE, timestamp)
+        elif gesture == "All Fingers Pointing Down":
+            self.handle_gesture(self.all_fingers_down_data, FLOOR_CHANGE_10X_CUE, timestamp)
+        elif gesture == "Index Finger Pointing Up":
+            self.handle_gesture(self.index_finger_up_data, FLOOR_CHANGE_1X_CUE, timestamp)
+        elif gesture == "Index Finger Pointing Down":
+            self.handle_gesture(self.index_finger_down_data, FLOOR_CHANGE_1X_CUE, timestamp)
+        elif gesture == "Victory (OK)":
+            # Confirm the current floor selection
+            self.handle_gesture(self.victory_gesture_data, CONFIRM_CUE, timestamp)
+        else:
+            # unrecognized frames still count towards the dwell gap so a stale run does not linger
+            self.dwell.update(gesture, time.monotonic() if timestamp is None else timestamp)
+            return "idle", False
+        return gesture, True
+
+    # true while any gesture (including the initial peace sign) is building up towards its threshold. The dwell is only
+    # updated on frames with a hand, so with a timestamp a run whose gap tolerance has passed no longer counts
+    def dwell_in_progress(self, timestamp=None):
+        return any(dwell.gesture is not None and (timestamp is None or not dwell.gap_exceeded(timestamp))
+                   for dwell in (self.dwell, self.initial_dwell))
+
+    def predicted_floor(self):
+        return self.current_floor + self.gesture_counter
 
@@ -0,0 +1,106 @@
+import numpy as np
+from hand import GESTURE_NAMES
+
+# Trainable alternative to the finger rules in hand.py. Landmarks are turned into wrist-relative, scale-invariant
+# features and scored by a linear model, so a frame (or a whole (N, 21, 3) batch) costs one matrix multiply.
+# Two kinds of model share that inference path:
+#   centroid  nearest class centroid in feature space. argmin |f - c|^2 = argmax (2 c.f - |c|^2), which is linear in f
+#   softmax   multinomial logistic regression trained with full batch gradient descent
+# Predictions are codes into hand.GESTURE_NAMES, so the model returns exactly the gesture names the rest of the app
+# uses. Models are trained per installation with calibrate.py and saved as small .npz files
+
+WRIST = 0
+MIDDLE_FINGER_MCP = 9
+INDEX_FINGER_MCP = 5
+PINKY_MCP = 17
+
+# (..., 21, 3) landmarks -> (..., 60) features: the other 20 landmarks relative to the wrist, divided by the
+# wrist -> middle finger knuckle distance so the distance to the camera does not matter. x is mirrored so the index
+# knuckle is always left of the pinky knuckle, which makes left and right hands (and palm vs back of the hand) look
+# the same. y keeps its sign, pointing up and pointing down must stay apart
+def landmark_features(landmarks):
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    relative = landmarks[..., 1:, :] - landmarks[..., WRIST, np.newaxis, :]
+    scale = np.linalg.norm(relative[..., MIDDLE_FINGER_MCP - 1, :2], axis=-1)
+    relative = relative / np.maximum(scale, 1e-6)[..., np.newaxis, np.newaxis]
+    mirrored = relative[..., INDEX_FINGER_MCP - 1, 0] > relative[..., PINKY_MCP - 1, 0]
+    relative[..., 0] = np.where(mirrored[..., np.newaxis], -relative[..., 0], relative[..., 0])
+    return relative.reshape(relative.shape[:-2] + (-1,))
+
+# appends the constant 1 the bias row of the weights multiplies with
+def with_bias(features):
+    return np.concatenate([features, np.ones(features.shape[:-1] + (1,))], axis=-1)
+
+
+class GestureModel:
+    # weights is (features + 1, classes), codes maps each model class to its index in GESTURE_NAMES
+    def __init__(self, weights, codes, kind="softmax"):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.codes = np.asarray(codes, dtype=np.int64)
+        self.kind = kind
+
+    # gesture codes for a (21, 3) hand (returns an int) or an (N, 21, 3) batch (returns N codes)
+    def predict_codes(self, landmarks):
+        scores = with_bias(landmark_features(landmarks)) @ self.weights
+        codes = self.codes[scores.argmax(axis=-1)]
+        return int(codes) if codes.ndim == 0 else codes
+
+    def predict_name(self, landmarks):
+        return GESTURE_NAMES[self.predict_codes(landmarks)]
+
+    def save(self, path):
+        np.savez(path, weights=self.weights, names=np.array([GESTURE_NAMES[code] for code in self.codes]),
+                 kind=np.array(self.kind))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            names = [str(name) for name in data["names"]]
+            unknown = [name for name in names if name not in GESTURE_NAMES]
+            if unknown:
+                raise ValueError(f"{path} predicts unknown gestures: {', '.join(unknown)}")
+            return cls(data["weights"], [GESTURE_NAMES.index(name) for name in names], str(data["kind"]))
+
+
+def train_centroid(features, labels, codes):
+    centroids = np.stack([features[labels == code].mean(axis=0) for code in codes])
+    weights = np.vstack([2 * centroids.T, -(centroids ** 2).sum(axis=1)])
+    return weights
+
+def train_softmax(features, labels, codes, iterations=500, learning_rate=0.5, l2=1e-3):
+    inputs = with_bias(features)
+    targets = (labels[:, np.newaxis] == codes[np.newaxis, :]).astype(np.float64)
+    weights = np.zeros((inputs.shape[1], len(codes)))
+    for _ in range(iterations):
+        scores = inputs @ weights
+        scores -= scores.max(axis=1, keepdims=True)
+        probabilities = np.exp(scores)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        gradient = inputs.T @ (probabilities - targets) / len(inputs) + l2 * weights
+        weights -= learning_rate * gradient
+    return weights
+
+# trains a model from (N, 21, 3) landmarks and their N gesture codes. Frames without a hand (NaN) or without a label
+# (code < 0) are ignored. Every gesture in the labels becomes a class, include Neutral frames (a relaxed hand, other
+# poses) or every hand in view is forced into one of the gestures
+def train_model(landmarks, labels, kind="softmax"):
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.int64)
+    keep = (labels >= 0) & ~np.isnan(landmarks).any(axis=(1, 2))
+    features = landmark_features(landmarks[keep])
+    labels = labels[keep]
+    codes = np.unique(labels)
+    if len(codes) < 2:
+        raise ValueError("need labelled frames of at least two gestures to train a model")
+    if kind == "centroid":
+        return GestureModel(train_centroid(features, labels, codes), codes, kind)
+    if kind == "softmax":
+        return GestureModel(train_softmax(features, labels, codes), codes, kind)
+    raise ValueError(f"unknown model kind {kind!r}, expected centroid or softmax")
+
+# share of frames per gesture (and overall) where predicted codes match the labels
+def accuracy_by_gesture(predicted, labels):
+    report = {"all": float(np.mean(predicted == labels)) if len(labels) else 0.0}
+    for code in np.unique(labels):
+        report[GESTURE_NAMES[code]] = float(np.mean(predicted[labels == code] == code))
+    return report
@@ -0,0 +1,69 @@
+import time
+
+# Adaptive frame-rate governor for always-on kiosks. It runs at active_fps while a hand is in view or a gesture dwell
+# is in progress and drops to idle_fps once nothing has been seen for idle_after seconds. The first frame with a hand
+# switches back to active immediately, so the very next frame is taken at full rate. cpu_budget (fraction of one core,
+# e.g. 0.5) additionally stretches the frame interval so the measured per-frame CPU cost stays within budget
+class FrameRateGovernor:
+    ACTIVE = "active"
+    IDLE = "idle"
+
+    def __init__(self, active_fps=30, idle_fps=2, idle_after=3.0, cpu_budget=None):
+        self.active_fps = active_fps
+        self.idle_fps = idle_fps
+        self.idle_after = idle_after
+        self.cpu_budget = cpu_budget
+
+        self.mode = self.ACTIVE
+        self.last_activity = time.monotonic()
+        self.frame_started = time.monotonic()
+        self.cpu_started = time.process_time()
+        self.mode_changes = 0
+
+        # exponential moving averages for reporting
+        self.fps = 0.0
+        self.cpu_usage = 0.0
+
+    # called once per processed frame with whether a hand was seen and whether a dwell is building up
+    def observe(self, hand_present, dwell_active, timestamp=None):
+        if timestamp is None:
+            timestamp = time.monotonic()
+        if hand_present or dwell_active:
+            self.last_activity = timestamp
+            self.set_mode(self.ACTIVE)
+        elif timestamp - self.last_activity >= self.idle_after:
+            self.set_mode(self.IDLE)
+
+    def set_mode(self, mode):
+        if mode != self.mode:
+            self.mode = mode
+            self.mode_changes += 1
+
+    # seconds to wait before taking the next frame, called once per frame after its work is done
+    def next_delay(self):
+        now = time.monotonic()
+        cpu = time.process_time()
+        work = now - self.frame_started
+        cpu_used = cpu - self.cpu_started
+
+        interval = 1 / (self.active_fps if self.mode == self.ACTIVE else self.idle_fps)
+        if self.cpu_budget:
+            interval = max(interval, cpu_used / self.cpu_budget)
+        delay = max(interval - work, 0.0)
+
+        # the frame interval that was actually achieved and the CPU share it used
+        if work > 0:
+            self.cpu_usage = 0.9 * self.cpu_usage + 0.1 * (cpu_used / max(work, interval))
+            self.fps = 0.9 * self.fps + 0.1 / max(work, interval)
+
+        self.frame_started = now + delay
+        self.cpu_started = cpu
+        return delay
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "fps": self.fps,
+            "cpu_usage": self.cpu_usage,
+            "mode_changes": self.mode_changes,
+        }
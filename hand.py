@@ -1,27 +1,121 @@
 import mediapipe as mp
+import numpy as np
 
 mp_hands = mp.solutions.hands
 
+FINGERS = ("INDEX_FINGER", "MIDDLE_FINGER", "RING_FINGER", "PINKY")
+
+# landmark indices of each finger ordered tip -> dip -> pip -> mcp, one row per finger in FINGERS order
+FINGER_JOINTS = np.array([[mp_hands.HandLandmark[f"{finger_name}_{joint}"] for joint in ("TIP", "DIP", "PIP", "MCP")]
+                          for finger_name in FINGERS])
+FINGER_JOINT_INDICES = FINGER_JOINTS.tolist()
+
+# gesture codes returned by classify_landmarks index into this tuple, the order is the recognition priority
+GESTURE_NAMES = (
+    "All Fingers Pointing Up",
+    "All Fingers Pointing Down",
+    "Victory (OK)",
+    "Index Finger Pointing Up",
+    "Index Finger Pointing Down",
+    "Neutral",
+)
+NEUTRAL_CODE = len(GESTURE_NAMES) - 1
+
+# converts a MediaPipe hand into a (21,3) float array of x, y, z, arrays are passed through untouched
+def landmarks_to_array(hand_landmarks):
+    if isinstance(hand_landmarks, np.ndarray):
+        return hand_landmarks
+    return np.array([(landmark.x, landmark.y, landmark.z) for landmark in hand_landmarks.landmark], dtype=np.float64)
+
+# computes whether every finger is pointing up or down for a (..., 21, 3) landmark array in a few comparisons.
+# Returns two (..., 4) boolean arrays in FINGERS order.
+# previous is the (up, down) result of the last frame of the same hand. With a hysteresis > 0 a finger that was
+# already up (or down) keeps that state as long as it misses the chain and the margin test by less than hysteresis,
+# so jitter around the thresholds does not flip it for single frames. Keep hysteresis below margin
+def fingers_pointing(landmarks, margin, hysteresis=0.0, previous=None):
+    y = landmarks[..., 1]
+    joints = y[..., FINGER_JOINTS]
+    mcp = joints[..., 3]
+    wrist = y[..., mp_hands.HandLandmark.WRIST, np.newaxis]
+
+    if previous is None or not hysteresis:
+        up = np.all(joints[..., :-1] < joints[..., 1:], axis=-1) & (mcp < wrist - margin)
+        down = np.all(joints[..., :-1] > joints[..., 1:], axis=-1) & (mcp > wrist + margin)
+        return up, down
+
+    up_slack = np.where(previous[0], hysteresis, 0.0)
+    down_slack = np.where(previous[1], hysteresis, 0.0)
+    up = np.all(joints[..., :-1] < joints[..., 1:] + up_slack[..., np.newaxis], axis=-1) & (mcp < wrist - margin + up_slack)
+    down = np.all(joints[..., :-1] > joints[..., 1:] - down_slack[..., np.newaxis], axis=-1) & (mcp > wrist + margin - down_slack)
+    return up, down
+
+# turns finger states into gesture codes. The conditions are stacked in priority order with an always true Neutral
+# last, so argmax (the first True) keeps the first match
+def classify_fingers(up, down):
+    index_up = up[..., 0]
+    index_down = down[..., 0]
+    victory = index_up & up[..., 1] & ~up[..., 2] & ~up[..., 3]
+    conditions = np.stack([up.all(axis=-1), down.all(axis=-1), victory, index_up, index_down,
+                           np.ones_like(index_up)], axis=-1)
+    return conditions.argmax(axis=-1)
+
+# The same two steps for a single hand in plain Python. On one hand NumPy's per-call overhead costs more than the
+# dozen comparisons themselves, so Hand uses these, the results are identical to the batched versions.
+# ys holds the 21 y coordinates, previous is the last frame's (up, down) as in fingers_pointing
+def finger_states(ys, margin, hysteresis=0.0, previous=None):
+    wrist = ys[mp_hands.HandLandmark.WRIST]
+    up = []
+    down = []
+    for finger_index, (tip, dip, pip, mcp) in enumerate(FINGER_JOINT_INDICES):
+        tip, dip, pip, mcp = ys[tip], ys[dip], ys[pip], ys[mcp]
+        up_slack = hysteresis if previous is not None and previous[0][finger_index] else 0.0
+        down_slack = hysteresis if previous is not None and previous[1][finger_index] else 0.0
+        up.append(tip < dip + up_slack and dip < pip + up_slack and pip < mcp + up_slack and
+                  mcp < wrist - margin + up_slack)
+        down.append(tip > dip - down_slack and dip > pip - down_slack and pip > mcp - down_slack and
+                    mcp > wrist + margin - down_slack)
+    return tuple(up), tuple(down)
+
+def finger_code(up, down):
+    if all(up):
+        return 0
+    if all(down):
+        return 1
+    if up[0] and up[1] and not up[2] and not up[3]:
+        return 2
+    if up[0]:
+        return 3
+    if down[0]:
+        return 4
+    return NEUTRAL_CODE
+
+# classifies a whole (N, 21, 3) stack of hands or frames in one call and returns N gesture codes
+def classify_landmarks(landmarks, margin):
+    up, down = fingers_pointing(np.asarray(landmarks, dtype=np.float64), margin)
+    return classify_fingers(up, down)
+
 #This class gets the cooadinations of each finger check wether or not that finger is poiting and if pointing up or down
 # our gestures is based around how many fingers are up or down
+# hysteresis and previous (the last frame's (up, down)) are passed on to finger_states
 class Hand:
-    def __init__(self, hand_landmarks, margin):
+    def __init__(self, hand_landmarks, margin, hysteresis=0.0, previous=None):
         self.hand_landmarks = hand_landmarks
         self.margin = margin
-        self.wrist = hand_landmarks.landmark[mp_hands.HandLandmark.WRIST]
+        if isinstance(hand_landmarks, np.ndarray):
+            self.wrist = hand_landmarks[mp_hands.HandLandmark.WRIST]
+            ys = hand_landmarks[:, 1].tolist()
+        else:
+            self.wrist = hand_landmarks.landmark[mp_hands.HandLandmark.WRIST]
+            ys = [landmark.y for landmark in hand_landmarks.landmark]
+        # every finger predicate is computed once up front, the methods below only look the answer up
+        self.up, self.down = finger_states(ys, margin, hysteresis, previous)
 
     def finger_pointing(self, finger_name, direction):
-        finger_tip = self.hand_landmarks.landmark[getattr(mp_hands.HandLandmark, f"{finger_name}_TIP")]
-        finger_dip = self.hand_landmarks.landmark[getattr(mp_hands.HandLandmark, f"{finger_name}_DIP")]
-        finger_pip = self.hand_landmarks.landmark[getattr(mp_hands.HandLandmark, f"{finger_name}_PIP")]
-        finger_mcp = self.hand_landmarks.landmark[getattr(mp_hands.HandLandmark, f"{finger_name}_MCP")]
-        
+        finger_index = FINGERS.index(finger_name)
         if direction == 'up':
-            return (finger_tip.y < finger_dip.y and finger_dip.y < finger_pip.y and
-                    finger_pip.y < finger_mcp.y and finger_mcp.y < self.wrist.y - self.margin)
+            return self.up[finger_index]
         elif direction == 'down':
-            return (finger_tip.y > finger_dip.y and finger_dip.y > finger_pip.y and
-                    finger_pip.y > finger_mcp.y and finger_mcp.y > self.wrist.y + self.margin)
+            return self.down[finger_index]
 
     def finger_up(self, finger_name):
         return self.finger_pointing(finger_name, 'up')
@@ -30,19 +124,19 @@ class Hand:
         return self.finger_pointing(finger_name, 'down')
 
     def all_fingers_up_except_thumb(self):
-        return (self.finger_up('INDEX_FINGER') and
-                self.finger_up('MIDDLE_FINGER') and
-                self.finger_up('RING_FINGER') and
-                self.finger_up('PINKY'))
+        return all(self.up)
 
     def all_fingers_down_except_thumb(self):
-        return (self.finger_down('INDEX_FINGER') and
-                self.finger_down('MIDDLE_FINGER') and
-                self.finger_down('RING_FINGER') and
-                self.finger_down('PINKY'))
+        return all(self.down)
 
     def victory_gesture(self):
         return (self.finger_up('INDEX_FINGER') and
                 self.finger_up('MIDDLE_FINGER') and
                 not self.finger_up('RING_FINGER') and
                 not self.finger_up('PINKY'))
+
+    def gesture_code(self):
+        return finger_code(self.up, self.down)
+
+    def gesture_name(self):
+        return GESTURE_NAMES[self.gesture_code()]
@@ -1,195 +1,364 @@
-import os
-import sys
-import cv2
-import mediapipe as mp
-import pygame
-from UI import ElevatorUI
-from gesture_handler import GestureHandler
 import time
+# startup phases are measured from here, before any other import
+STARTED = time.perf_counter()
+import argparse
+from startup import StartupProfile, Warmup
+from autotune import DEFAULT_PROFILE_PATH, apply_capture, load_profile
+from UI import ElevatorUI
 
-# MediaPipe initialization
-mp_drawing = mp.solutions.drawing_utils
-mp_hands = mp.solutions.hands
-
-# Open webcam
-cap = cv2.VideoCapture(0)
-hands = mp_hands.Hands(max_num_hands=1)
+parser = argparse.ArgumentParser(description="Gesture-controlled elevator")
+parser.add_argument("--pipeline", action="store_true",
+                    help="run capture, inference and rendering on worker threads instead of the Tk thread")
+parser.add_argument("--record", metavar="PATH",
+                    help="append every frame's landmarks and recognized gesture to a landmark session file (.lmk)")
+parser.add_argument("--fast-render", action="store_true",
+                    help="paste frames into one preallocated display image and cap the display refresh rate")
+parser.add_argument("--max-display-fps", type=float, default=30,
+                    help="display refresh cap used with --fast-render")
+parser.add_argument("--adaptive-fps", action="store_true",
+                    help="drop to a low frame rate while nobody is in front of the camera")
+parser.add_argument("--active-fps", type=float, default=30, help="frame rate while a hand is in view")
+parser.add_argument("--idle-fps", type=float, default=2, help="frame rate with no hand in view")
+parser.add_argument("--idle-after", type=float, default=3.0, help="seconds without a hand before going idle")
+parser.add_argument("--cpu-budget", type=float, help="fraction of one core the loop may use, e.g. 0.5")
+parser.add_argument("--metrics-file", metavar="PATH",
+                    help="periodically rewrite a Prometheus text file with per-stage latency metrics")
+parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+parser.add_argument("--debug-overlay", action="store_true", help="draw per-stage latencies on the video")
+parser.add_argument("--preallocate", action="store_true",
+                    help="read, flip and colour-convert frames into reused buffers instead of new arrays")
+parser.add_argument("--mirror-landmarks", action="store_true",
+                    help="with --preallocate, run the model on the unflipped frame and mirror the landmarks instead")
+parser.add_argument("--smoothing", choices=("none", "ema", "one-euro"), default="none",
+                    help="temporal landmark filter applied before the gesture is recognized")
+parser.add_argument("--hysteresis", type=float, default=0.0,
+                    help="slack for fingers to keep their up/down state, in image heights (keep below the margin)")
+parser.add_argument("--model", metavar="PATH",
+                    help="recognize gestures with a model trained by calibrate.py instead of the finger rules")
+parser.add_argument("--max-hands", type=int, default=1,
+                    help="track up to this many hands, each with its own dwell state")
+parser.add_argument("--arbitration", choices=("owner", "largest"), default="owner",
+                    help="with --max-hands > 1, whose gestures drive the floor selection")
+parser.add_argument("--profile", default=DEFAULT_PROFILE_PATH,
+                    help="hand model and capture settings chosen by autotune.py, defaults are used if the file is missing")
+parser.add_argument("--blocking-startup", action="store_true",
+                    help="load the camera, the model and the audio before opening the window instead of while it shows")
+args = parser.parse_args()
+
+profile = StartupProfile(STARTED)
+
+# model complexity, confidences and capture resolution tuned for this machine by autotune.py
+inference_profile = load_profile(args.profile)
 
 margin = 0.05  # More margin means more fingers must be up or down from the wrist
 
-# Initial victory gesture frames requirement
-initial_victory_frames = 30
-initial_victory_counter = 0
-initializing = True
-
 # Global current floor variable
 current_floor = 0
 predicted_floor = 0
 
-# Pygame mixer initialization
-pygame.mixer.init()
+# cv2, MediaPipe and pygame take seconds to import and the camera, the hand model and the mixer take seconds more to
+# start, so all of it is loaded by the warm-up phases below while the window already shows "Warming up". Everything
+# they create is a module global used by the frame loop, which only starts once the warm-up is ready
+cap = None
+hands = None
+audio = None
+pipeline = None
+recorder = None
+
+# Open webcam, the first read starts the sensor and is by far the slowest
+def open_camera():
+    global cv2, cap
+    import cv2
+    cap = cv2.VideoCapture(0)
+    apply_capture(cap, inference_profile)
+    cap.read()
+
+def load_modules():
+    global cv2, mp, mp_drawing, mp_hands, STATE_CONFIG, draw_banner, draw_detection_box, landmarks_to_array
+    global Pipeline, gesture_handler, multi_hand, governor, preprocessor, metrics, recorder
+    import cv2
+    import mediapipe as mp
+    from gesture_handler import GestureHandler
+    from pipeline import Pipeline
+    from recording import SessionRecorder
+    from governor import FrameRateGovernor
+    from metrics import Metrics
+    from preprocess import FramePreprocessor
+    from overlay import STATE_CONFIG, draw_banner, draw_detection_box
+    from hand import landmarks_to_array
+    from smoothing import make_filter
+    from gesture_model import GestureModel
+    from tracking import MultiHandHandler
+
+    # MediaPipe initialization
+    mp_drawing = mp.solutions.drawing_utils
+    mp_hands = mp.solutions.hands
+
+    # Initialize GestureHandler, it gets its audio cues once they are loaded
+    classifier = GestureModel.load(args.model) if args.model else None
+    gesture_handler = GestureHandler(margin, landmark_filter=make_filter(args.smoothing), hysteresis=args.hysteresis,
+                                     classifier=classifier)
+    # several hands get a track and dwell state each, the arbitration decides whose gestures apply
+    multi_hand = MultiHandHandler(gesture_handler, args.arbitration, args.smoothing) if args.max_hands > 1 else None
+
+    # Optional frame rate governor that idles the loop when nobody is there
+    governor = FrameRateGovernor(args.active_fps, args.idle_fps, args.idle_after, args.cpu_budget) if args.adaptive_fps else None
+
+    # Optional preallocated preprocessing, the pipeline keeps more frames in flight so it needs a deeper buffer ring
+    preprocessor = None
+    if args.preallocate:
+        preprocessor = FramePreprocessor(buffers=8 if args.pipeline else 2, mirror_landmarks=args.mirror_landmarks)
+
+    # Per-stage latency metrics, always collected and exported on request
+    metrics = Metrics()
+    if args.metrics_file:
+        metrics.start_file_export(args.metrics_file)
+    if args.metrics_port:
+        metrics.start_http_server(args.metrics_port)
+
+    # Optional session recorder for offline replay and threshold tuning
+    recorder = SessionRecorder(args.record) if args.record else None
+
+# Builds the hand model and runs one inference on a blank frame, so the first real frame does not pay for the
+# graph initialization
+def load_model():
+    global hands
+    import numpy as np
+    hands = mp_hands.Hands(max_num_hands=args.max_hands, **inference_profile["hands_options"])
+    hands.process(np.zeros((256, 256, 3), dtype=np.uint8))
+
+# Decode all audio cues once up front, a missing file fails here instead of mid-interaction
+def load_audio():
+    global audio
+    from audio import AudioCache
+    audio = AudioCache()
+    gesture_handler.audio = audio
+
+# the camera opens on its own thread while the modules and the model load on another
+warmup = Warmup(profile, [
+    [("camera", open_camera)],
+    [("modules", load_modules), ("model", load_model), ("audio", load_audio)],
+])
+if args.blocking_startup:
+    warmup.run()
 
 # Initialize UI
-ui = ElevatorUI()
-
-# Initialize GestureHandler
-gesture_handler = GestureHandler(margin)
-
-CONFIRM_AUDIO_PATH = os.path.join(getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__))), "audio/Confirm.mp3")
-FLOOR_CHANGE_1X_AUDIO_PATH = os.path.join(getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__))), "audio/Floor_Change_1x.mp3")
-FLOOR_CHANGE_10X_AUDIO_PATH = os.path.join(getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__))), "audio/Floor_Change_10x.mp3")
-
-#draws the box around the hand , the text and its background above the box DO NOT CHANGE THE COORDINATES
-def draw_detection_box(results, image, box_color, label_text, predicted_floor, show_floor=False):
-    hand_landmarks_list = results.multi_hand_landmarks
-    for i in range(len(hand_landmarks_list)):
-        hand_landmarks = hand_landmarks_list[i]
-        x_coordinates = [landmark.x for landmark in hand_landmarks.landmark]
-        y_coordinates = [landmark.y for landmark in hand_landmarks.landmark]
-        # Mirror the box coordinates as well so it matches the capture mirroring
-        x_top_right = int(min(x_coordinates) * image.shape[1]) - 25
-        y_top_right = int(min(y_coordinates) * image.shape[0]) - 25
-        x_bottom_left = int(max(x_coordinates) * image.shape[1]) + 25
-        y_bottom_left = int(max(y_coordinates) * image.shape[0]) + 25
-        box_width = x_bottom_left - x_top_right
-
-        #we are drawing the text and the rectangles in scale of each other so they dont get out 
-        cv2.rectangle(image, (x_top_right, y_top_right), (x_bottom_left, y_bottom_left), box_color, thickness=10)
-        cv2.rectangle(image, (x_top_right, y_top_right), (x_bottom_left, y_bottom_left), (0, 0, 0), thickness=3)
-        if gesture_handler.initializing:
-            cv2.rectangle(image, (x_top_right - 3, y_top_right - 30), (x_top_right + 100 + box_width, y_top_right), (0, 0, 0), thickness=-1)
-            cv2.putText(image, label_text, (x_top_right + 5, y_top_right - 5), cv2.FONT_HERSHEY_SIMPLEX, color=box_color, fontScale=1)
-        # Draw the predicted floor above the gesture label only if we are able to change the floor
-        if show_floor:
-            # Draw black box background for predicted floor
-            cv2.rectangle(image, (x_top_right - 3, y_top_right - 60), (x_top_right + 175 + box_width, y_top_right - 30), (0, 0, 0), thickness=-1)
-            cv2.putText(image, f"You are going to floor: {predicted_floor}", (x_top_right + 5, y_top_right - 35), cv2.FONT_HERSHEY_SIMPLEX, color=box_color, fontScale=min(box_width / 250, 0.75))
-    return image
-
-def update():
-    # Initialize predicted_floor with the current calculation
-    predicted_floor = gesture_handler.current_floor + gesture_handler.gesture_counter
-    
-    # Capture image from webcam
-    success, image = cap.read()
-    if not success:
-        return
-    
-    # Flip and process the image so we don't see a mirrored version of ourselves
-    image = cv2.cvtColor(cv2.flip(image, 1), cv2.COLOR_BGR2RGB)
-    results = hands.process(image)
-
-    # Add initializing text to the image
-    if gesture_handler.initializing:
-        # Make the text flash by alternating visibility based on time
-        if int(time.time() * 2) % 1 == 0:
-            cv2.putText(image, "Show Peace Sign", (50, 200), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 0), 6, cv2.LINE_AA)
-            cv2.putText(image, "Show Peace Sign", (50, 200), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 0), 2, cv2.LINE_AA)
-    else:
-        cv2.putText(image, "Selecting Floor", (200, 50), cv2.FONT_HERSHEY_SIMPLEX, 1,(255, 255, 255), 6)
-        cv2.putText(image, "Selecting Floor", (200, 50), cv2.FONT_HERSHEY_SIMPLEX, 1,(0, 0, 0), 2)
-
-  
-
-    # State-specific box colors and labels
-    state_config = {
-        "Victory (OK)": {"box_color": (255,255,0), "label_text": "Victory (OK)"},
-
-        "All Fingers Pointing Up": {"box_color": (0, 255, 0), "label_text": "All Fingers Pointing Up"},
+ui = ElevatorUI(fast_render=args.fast_render, max_display_fps=args.max_display_fps)
+if not args.blocking_startup:
+    ui.show_status("Warming up...")
+    warmup.start()
+
+# Flip and process the image so we don't see a mirrored version of ourselves, then run the hand model and the
+# gesture state machine. Returns everything the render stage and the UI need as a plain dict snapshot
+def process_frame(image, timestamp):
+    with metrics.stage("preprocess"):
+        if preprocessor:
+            image = preprocessor.to_model_input(image)
+        else:
+            image = cv2.cvtColor(cv2.flip(image, 1), cv2.COLOR_BGR2RGB)
+    with metrics.stage("inference"):
+        results = hands.process(image)
+    if preprocessor:
+        preprocessor.mirror_results(results)
 
-        "All Fingers Pointing Down": {"box_color": (255,0,0), "label_text": "All Fingers Pointing Down"},
+    current_state = "idle"
+    show_floor = False
+    recorded = False
+    # one (21, 3) array per hand, shared by the classifier, the recorder and the overlay
+    landmarks_list = []
+    # per hand track, gesture and overlay state with --max-hands > 1
+    tracked_hands = None
 
-        "Index Finger Pointing Up": {"box_color": (50,205,50), "label_text": "Index Finger Pointing Up"},
+    # If hands are detected, process the landmarks
+    if results.multi_hand_landmarks and multi_hand:
+        with metrics.stage("gesture"):
+            landmarks_list = [landmarks_to_array(hand_landmarks) for hand_landmarks in results.multi_hand_landmarks]
+            tracked_hands = multi_hand.process_hands(landmarks_list, timestamp)
+            for event in multi_hand.events:
+                metrics.record_event(event)
+            driver = next((hand for hand in tracked_hands if hand["driving"]), tracked_hands[0])
+            current_state, show_floor = driver["state"], driver["show_floor"]
+            # a session holds one hand per frame, record the one driving the selection so a replay of the
+            # session reproduces its decisions
+            if recorder:
+                hand_index = tracked_hands.index(driver)
+                handedness = results.multi_handedness[hand_index].classification[0].label
+                recorder.write(timestamp, landmarks_list[hand_index], handedness, driver["gesture"])
+                recorded = True
+    elif results.multi_hand_landmarks:
+        with metrics.stage("gesture"):
+            landmarks_list = [landmarks_to_array(hand_landmarks) for hand_landmarks in results.multi_hand_landmarks]
+            for hand_index, landmarks in enumerate(landmarks_list):
+                # Recognize gesture from landmarks
+                gesture = gesture_handler.recognize_gesture(landmarks, timestamp)
+                if recorder and not recorded:
+                    handedness = results.multi_handedness[hand_index].classification[0].label
+                    recorder.write(timestamp, landmarks, handedness, gesture)
+                    recorded = True
+                was_initializing = gesture_handler.initializing
+                current_state, show_floor = gesture_handler.process_gesture(gesture, timestamp)
+                if gesture_handler.last_event:
+                    metrics.record_event(gesture_handler.last_event)
+                if was_initializing:
+                    break
+
+    if recorder and not recorded:
+        recorder.write(timestamp)
+
+    if governor:
+        dwell_active = multi_hand.dwell_in_progress(timestamp) if multi_hand else gesture_handler.dwell_in_progress(timestamp)
+        governor.observe(bool(results.multi_hand_landmarks), dwell_active, timestamp)
+        metrics.set_gauge("idle_mode", int(governor.mode == governor.IDLE))
+        metrics.set_counter("governor_mode_changes", governor.mode_changes)
+
+    return {
+        "image": image,
+        "timestamp": timestamp,
+        "results": results,
+        "landmarks": landmarks_list,
+        "tracked_hands": tracked_hands,
+        "current_state": current_state,
+        "show_floor": show_floor,
+        "initializing": gesture_handler.initializing,
+        "is_first_initialization": gesture_handler.is_first_initialization,
+        "initial_victory_counter": gesture_handler.initial_victory_counter,
+        "current_floor": gesture_handler.current_floor,
+        "predicted_floor": gesture_handler.predicted_floor(),
+    }
 
-        "Index Finger Pointing Down": {"box_color": (220,20,60), "label_text": "Index Finger Pointing Down"},
+# Draws the banners, the hand landmarks and the detection box onto the frame image
+def render_frame(frame):
+    with metrics.stage("overlay"):
+        return draw_overlay(frame)
 
-        "idle": {"box_color": (169, 169, 169), "label_text": "Idle"}  
-    }
+def draw_overlay(frame):
+    image = preprocessor.to_display(frame["image"]) if preprocessor else frame["image"]
+    results = frame["results"]
 
-    current_state = "idle"
-    show_floor = False
+    # Add initializing text to the image
+    # Make the text flash by alternating visibility based on time
+    if not frame["initializing"] or int(time.time() * 2) % 1 == 0:
+        draw_banner(image, frame["initializing"])
 
-    # If hands are detected, process the landmarks
     if results.multi_hand_landmarks:
         for hand_landmarks in results.multi_hand_landmarks:
             # Draw the landmarks on the fingers and also get their position
             mp_drawing.draw_landmarks(
                 image, hand_landmarks, mp_hands.HAND_CONNECTIONS)
 
-            # Recognize gesture from landmarks
-            gesture = gesture_handler.recognize_gesture(hand_landmarks)
-
-            # Handle initializing phase
-            if gesture_handler.initializing:
-                if gesture == "Victory (OK)":
-                    gesture_handler.handle_initializing(gesture)
-                    predicted_floor = gesture_handler.current_floor + gesture_handler.gesture_counter
-                    # Show instructions during initialization
-                    current_state = "Victory (OK)"
-                else:
-                    current_state = "idle"
-                break
-
-            # Handle gestures while changing floors
-            if not gesture_handler.initializing:
-                if gesture == "All Fingers Pointing Up":
-                    gesture_handler.handle_gesture(gesture_handler.all_fingers_up_data, FLOOR_CHANGE_10X_AUDIO_PATH)
-                    current_state = "All Fingers Pointing Up"
-                    show_floor = True
-
-                elif gesture == "All Fingers Pointing Down":
-                    gesture_handler.handle_gesture(gesture_handler.all_fingers_down_data, FLOOR_CHANGE_10X_AUDIO_PATH)
-                    current_state = "All Fingers Pointing Down"
-                    show_floor = True
-
-                elif gesture == "Index Finger Pointing Up":
-                    gesture_handler.handle_gesture(gesture_handler.index_finger_up_data, FLOOR_CHANGE_1X_AUDIO_PATH)
-                    current_state = "Index Finger Pointing Up"
-                    show_floor = True
-
-                elif gesture == "Index Finger Pointing Down":
-                    gesture_handler.handle_gesture(gesture_handler.index_finger_down_data, FLOOR_CHANGE_1X_AUDIO_PATH)
-                    current_state = "Index Finger Pointing Down"
-                    show_floor = True
-
-                elif gesture == "Victory (OK)":
-                    # Confirm the current floor selection
-                    gesture_handler.handle_gesture(gesture_handler.victory_gesture_data, CONFIRM_AUDIO_PATH)
-                    current_state = "Victory (OK)"
-                    show_floor = True
-
-                # Update predicted floor
-                predicted_floor = gesture_handler.current_floor + gesture_handler.gesture_counter
-
         # Draw detection box around the detected hand
-        box_color = state_config[current_state]["box_color"]
-        label_text = state_config[current_state]["label_text"]
-        image = draw_detection_box(results, image, box_color, label_text, predicted_floor, show_floor=show_floor)
-
+        if frame["tracked_hands"]:
+            # every tracked hand gets its own state, hands that may not drive the selection stay idle
+            for landmarks, hand in zip(frame["landmarks"], frame["tracked_hands"]):
+                config = STATE_CONFIG[hand["state"]]
+                image = draw_detection_box([landmarks], image, config["box_color"], config["label_text"],
+                                           frame["predicted_floor"], show_floor=hand["show_floor"],
+                                           initializing=frame["initializing"])
+        else:
+            box_color = STATE_CONFIG[frame["current_state"]]["box_color"]
+            label_text = STATE_CONFIG[frame["current_state"]]["label_text"]
+            image = draw_detection_box(frame["landmarks"], image, box_color, label_text, frame["predicted_floor"],
+                                       show_floor=frame["show_floor"], initializing=frame["initializing"])
+
+    # Per-stage latencies in the bottom left corner
+    if args.debug_overlay:
+        for line_index, line in enumerate(reversed(metrics.overlay_lines())):
+            cv2.putText(image, line, (10, image.shape[0] - 10 - 20 * line_index), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+    frame["image"] = image
+    return frame
+
+# Pushes a finished frame and its floor state into the Tk widgets, only ever called on the Tk thread
+def show_frame(frame):
+    metrics.count("frames")
     # Update UI elements
-    ui.update_video(image)
-    ui.update_floor_display(gesture_handler.current_floor, predicted_floor)
-    
-    # Schedule the next update
-    ui.root.after(10, update)
+    with metrics.stage("render"):
+        ui.update_video(frame["image"])
+    metrics.set_counter("display_skipped_frames", ui.skipped_frames)
+    ui.update_floor_display(frame["current_floor"], frame["predicted_floor"])
 
     # Inside the update function, after gesture handling
-    if gesture_handler.initializing or gesture_handler.is_first_initialization:
+    if frame["initializing"] or frame["is_first_initialization"]:
         # Hide instructions during very first initialization
         ui.hide_instructions()
-    elif not gesture_handler.initializing:
+    elif not frame["initializing"]:
         # Show instructions right after initialization
         if not ui.floor_selected:
             ui.show_instructions()
         
         # Reset floor_selected when starting a new gesture sequence
-        if gesture_handler.initial_victory_counter >= 0:
+        if frame["initial_victory_counter"] >= 0:
             ui.floor_selected = False
             ui.show_instructions()
 
+def read_frame():
+    with metrics.stage("capture"):
+        return preprocessor.read(cap) if preprocessor else cap.read()
+
+def update():
+    # Capture image from webcam
+    success, image = read_frame()
+    if not success:
+        return
+
+    frame = render_frame(process_frame(image, time.monotonic()))
+    show_frame(frame)
+
+    # Schedule the next update
+    ui.root.after(int(governor.next_delay() * 1000) if governor else 10, update)
+
+# In pipeline mode the Tk thread only picks up the newest finished frame, capture and inference run on workers.
+# A failed stage stops the pipeline and its error replaces the video
+def update_from_pipeline():
+    if pipeline.error:
+        pipeline.stop()
+        ui.show_status("Pipeline stopped: " + pipeline.error)
+        return
+    frame = pipeline.latest()
+    if frame is not None:
+        show_frame(frame)
+    for stage, dropped in pipeline.dropped_frames().items():
+        metrics.set_counter(f"dropped_frames_{stage}", dropped)
+    ui.root.after(10, update_from_pipeline)
+
+# Polled on the Tk thread until the warm-up is done, then reports the startup phases and starts the frame loop
+def wait_until_ready():
+    # the first callback runs once the main loop is up, i.e. when the window is on screen
+    profile.mark("window")
+    if not warmup.ready.is_set():
+        ui.root.after(50, wait_until_ready)
+        return
+    if warmup.errors:
+        ui.show_status("Startup failed: " + ", ".join(name for name, _ in warmup.errors))
+        return
+    profile.mark("ready")
+    report_startup()
+    ui.show_status("")
+    start_loop()
+
+def report_startup():
+    print(profile.summary_line())
+    report = profile.report()
+    for name, seconds in {**report["phases"], **report["marks"]}.items():
+        metrics.set_gauge(f"startup_{name}_seconds", round(seconds, 4))
+
+def start_loop():
+    global pipeline
+    if args.pipeline:
+        pipeline = Pipeline(read_frame, process_frame, render_frame, governor=governor)
+        pipeline.start()
+        update_from_pipeline()
+    else:
+        update()
+
 # Start the UI
-ui.start(update)
+ui.start(wait_until_ready)
 
 # The cleanup code should be called when the window is closed
-cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+if pipeline:
+    pipeline.stop()
+if cap is not None:
+    cap.release()
+    cv2.destroyAllWindows()
+if warmup.ready.is_set() and recorder:
+    recorder.close()
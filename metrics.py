@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Fixed-size ring buffer of the most recent samples. Recording is a single array write, percentiles are only computed
+# when somebody asks for them (export or overlay), so it is cheap enough to leave on in production
+class RollingHistogram:
+    def __init__(self, size=1024):
+        self.samples = np.zeros(size, dtype=np.float64)
+        self.index = 0
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, value):
+        self.samples[self.index] = value
+        self.index = (self.index + 1) % len(self.samples)
+        self.count += 1
+        self.total += value
+
+    def quantiles(self, quantiles=QUANTILES):
+        filled = self.samples[:min(self.count, len(self.samples))]
+        if len(filled) == 0:
+            return {quantile: 0.0 for quantile in quantiles}
+        values = np.quantile(filled, quantiles)
+        return dict(zip(quantiles, values.tolist()))
+
+
+# Reusable timer for one stage, use as `with metrics.stage("inference"):`. There is one per stage name, so each stage
+# must only be timed from one thread at a time (true for the Tk loop and for every pipeline worker)
+class StageTimer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter() - self.started)
+        return False
+
+
+class Metrics:
+    def __init__(self, window=1024):
+        self.window = window
+        self.stages = {}
+        self.timers = {}
+        self.counters = {}
+        self.gauges = {}
+        self.time_to_confirm = RollingHistogram(window)
+        self.decision_dwell = RollingHistogram(window)
+        self.selection_started = None
+
+    def stage(self, name):
+        timer = self.timers.get(name)
+        if timer is None:
+            self.stages[name] = RollingHistogram(self.window)
+            timer = self.timers[name] = StageTimer(self.stages[name])
+        return timer
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_counter(self, name, value):
+        self.counters[name] = value
+
+    def set_gauge(self, name, value):
+        self.gauges[name] = value
+
+    # feeds a GestureHandler decision event, the floor selection clock starts when the peace sign opens the selection
+    # and stops when the floor is confirmed
+    def record_event(self, event):
+        self.count(f"decisions_{event['kind']}")
+        self.decision_dwell.record(event["elapsed_ms"] / 1000)
+        if event["kind"] == "initialized":
+            self.selection_started = event["timestamp"]
+        elif event["kind"] == "floor_confirmed" and self.selection_started is not None:
+            self.time_to_confirm.record(event["timestamp"] - self.selection_started)
+            self.selection_started = None
+
+    def summary(self):
+        return {name: {**{f"p{int(q * 100)}_ms": value * 1000 for q, value in histogram.quantiles().items()},
+                       "count": histogram.count}
+                for name, histogram in list(self.stages.items())}
+
+    # short lines for the on-video debug overlay
+    def overlay_lines(self):
+        return [f"{name}: p50 {stage['p50_ms']:.1f} p95 {stage['p95_ms']:.1f} ms"
+                for name, stage in self.summary().items()]
+
+    def prometheus_text(self):
+        lines = ["# TYPE gesture_stage_seconds summary"]
+        for name, histogram in list(self.stages.items()):
+            for quantile, value in histogram.quantiles().items():
+                lines.append(f'gesture_stage_seconds{{stage="{name}",quantile="{quantile}"}} {value:.6f}')
+            lines.append(f'gesture_stage_seconds_sum{{stage="{name}"}} {histogram.total:.6f}')
+            lines.append(f'gesture_stage_seconds_count{{stage="{name}"}} {histogram.count}')
+
+        for metric, histogram in (("gesture_time_to_confirm_seconds", self.time_to_confirm),
+                                  ("gesture_decision_dwell_seconds", self.decision_dwell)):
+            lines.append(f"# TYPE {metric} summary")
+            for quantile, value in histogram.quantiles().items():
+                lines.append(f'{metric}{{quantile="{quantile}"}} {value:.6f}')
+            lines.append(f"{metric}_sum {histogram.total:.6f}")
+            lines.append(f"{metric}_count {histogram.count}")
+
+        for name, value in list(self.counters.items()):
+            lines.append(f"# TYPE gesture_{name}_total counter")
+            lines.append(f"gesture_{name}_total {value}")
+        for name, value in list(self.gauges.items()):
+            lines.append(f"# TYPE gesture_{name} gauge")
+            lines.append(f"gesture_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    # rewrites a Prometheus text file (e.g. for the node_exporter textfile collector) every interval seconds.
+    # The file is replaced atomically so a scrape never sees half a file
+    def start_file_export(self, path, interval=10.0):
+        def export():
+            while True:
+                temp_path = f"{path}.tmp"
+                with open(temp_path, "w") as f:
+                    f.write(self.prometheus_text())
+                os.replace(temp_path, path)
+                time.sleep(interval)
+
+        threading.Thread(target=export, name="metrics-file", daemon=True).start()
+
+    # serves the Prometheus text on http://host:port/metrics from a daemon thread
+    def start_http_server(self, port, host="127.0.0.1"):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
@@ -0,0 +1,133 @@
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+# State-specific box colors and labels
+STATE_CONFIG = {
+    "Victory (OK)": {"box_color": (255,255,0), "label_text": "Victory (OK)"},
+
+    "All Fingers Pointing Up": {"box_color": (0, 255, 0), "label_text": "All Fingers Pointing Up"},
+
+    "All Fingers Pointing Down": {"box_color": (255,0,0), "label_text": "All Fingers Pointing Down"},
+
+    "Index Finger Pointing Up": {"box_color": (50,205,50), "label_text": "Index Finger Pointing Up"},
+
+    "Index Finger Pointing Down": {"box_color": (220,20,60), "label_text": "Index Finger Pointing Down"},
+
+    "idle": {"box_color": (169, 169, 169), "label_text": "Idle"}
+}
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+# the two-pass outlined banners drawn on top of the video, as (color, thickness, line type) passes
+INITIALIZING_BANNER = ("Show Peace Sign", 2, ((0, 0, 0), 6, cv2.LINE_AA), ((255, 255, 0), 2, cv2.LINE_AA))
+SELECTING_BANNER = ("Selecting Floor", 1, ((255, 255, 255), 6, cv2.LINE_8), ((0, 0, 0), 2, cv2.LINE_8))
+
+# the floor text scales with the box, the scale is snapped to this step so the sprites can be cached
+FLOOR_TEXT_SCALE_STEP = 0.025
+
+
+# Text rendered once into a small premultiplied colour patch plus alpha mask. origin is where the text baseline starts
+# inside the patch, so the sprite lands exactly where cv2.putText would have drawn the text
+class Sprite:
+    def __init__(self, text, scale, passes):
+        thickness = max(pass_thickness for _, pass_thickness, _ in passes)
+        (width, height), baseline = cv2.getTextSize(text, FONT, scale, thickness)
+        # some glyphs (brackets, descenders) reach past the reported text box
+        pad = thickness + int(10 * scale) + 2
+        shape = (height + baseline + 2 * pad, width + 2 * pad)
+        self.origin = (pad, height + pad)
+
+        colour = np.zeros(shape + (3,), dtype=np.uint8)
+        mask = np.zeros(shape, dtype=np.uint8)
+        for pass_colour, thickness, line_type in passes:
+            cv2.putText(colour, text, self.origin, FONT, scale, pass_colour, thickness, line_type)
+            cv2.putText(mask, text, self.origin, FONT, scale, 255, thickness, line_type)
+
+        self.opaque = bool(np.all((mask == 0) | (mask == 255)))
+        self.mask = mask
+        self.colour = colour
+        # for anti-aliased text: the colour patch is already premultiplied (drawn on black), blending keeps
+        # (255 - alpha) of the background and adds the patch
+        self.inverse_alpha = cv2.merge([255 - mask] * 3)
+
+    # alpha-blends the sprite into image in place with its text origin at (x, y), clipped to the image
+    def blend(self, image, x, y):
+        top = y - self.origin[1]
+        left = x - self.origin[0]
+        height, width = self.mask.shape
+        y0, x0 = max(top, 0), max(left, 0)
+        y1, x1 = min(top + height, image.shape[0]), min(left + width, image.shape[1])
+        if y0 >= y1 or x0 >= x1:
+            return
+        target = image[y0:y1, x0:x1]
+        rows = slice(y0 - top, y1 - top)
+        columns = slice(x0 - left, x1 - left)
+        if self.opaque:
+            cv2.copyTo(self.colour[rows, columns], self.mask[rows, columns], target)
+        else:
+            cv2.multiply(target, self.inverse_alpha[rows, columns], dst=target, scale=1 / 255)
+            cv2.add(target, self.colour[rows, columns], dst=target)
+
+
+# Least recently used cache of rendered sprites keyed by (text, scale, passes)
+class SpriteCache:
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self.sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text, scale, passes):
+        key = (text, scale, passes)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            self.misses += 1
+            sprite = self.sprites[key] = Sprite(text, scale, passes)
+            if len(self.sprites) > self.max_size:
+                self.sprites.popitem(last=False)
+        else:
+            self.hits += 1
+            self.sprites.move_to_end(key)
+        return sprite
+
+
+sprite_cache = SpriteCache()
+
+
+def draw_banner(image, initializing):
+    text, scale, *passes = INITIALIZING_BANNER if initializing else SELECTING_BANNER
+    origin = (50, 200) if initializing else (200, 50)
+    sprite_cache.get(text, scale, tuple(passes)).blend(image, *origin)
+    return image
+
+
+#draws the box around the hand , the text and its background above the box DO NOT CHANGE THE COORDINATES
+# landmarks_list holds one (21, 3) landmark array per hand, the extents come from one min/max over each array
+def draw_detection_box(landmarks_list, image, box_color, label_text, predicted_floor, show_floor=False, initializing=False):
+    box_color = tuple(box_color)
+    for landmarks in landmarks_list:
+        low = landmarks[:, :2].min(axis=0)
+        high = landmarks[:, :2].max(axis=0)
+        # Mirror the box coordinates as well so it matches the capture mirroring
+        x_top_right = int(low[0] * image.shape[1]) - 25
+        y_top_right = int(low[1] * image.shape[0]) - 25
+        x_bottom_left = int(high[0] * image.shape[1]) + 25
+        y_bottom_left = int(high[1] * image.shape[0]) + 25
+        box_width = x_bottom_left - x_top_right
+
+        #we are drawing the text and the rectangles in scale of each other so they dont get out
+        cv2.rectangle(image, (x_top_right, y_top_right), (x_bottom_left, y_bottom_left), box_color, thickness=10)
+        cv2.rectangle(image, (x_top_right, y_top_right), (x_bottom_left, y_bottom_left), (0, 0, 0), thickness=3)
+        if initializing:
+            cv2.rectangle(image, (x_top_right - 3, y_top_right - 30), (x_top_right + 100 + box_width, y_top_right), (0, 0, 0), thickness=-1)
+            sprite_cache.get(label_text, 1, ((box_color, 1, cv2.LINE_8),)).blend(image, x_top_right + 5, y_top_right - 5)
+        # Draw the predicted floor above the gesture label only if we are able to change the floor
+        if show_floor:
+            # Draw black box background for predicted floor
+            cv2.rectangle(image, (x_top_right - 3, y_top_right - 60), (x_top_right + 175 + box_width, y_top_right - 30), (0, 0, 0), thickness=-1)
+            scale = round(min(box_width / 250, 0.75) / FLOOR_TEXT_SCALE_STEP) * FLOOR_TEXT_SCALE_STEP
+            if scale > 0:
+                sprite_cache.get(f"You are going to floor: {predicted_floor}", scale, ((box_color, 1, cv2.LINE_8),)).blend(
+                    image, x_top_right + 5, y_top_right - 35)
+    return image
@@ -0,0 +1,120 @@
+import threading
+import time
+import traceback
+from collections import deque
+
+# A bounded queue where the newest item always wins. When the queue is full the oldest item is dropped
+# instead of blocking the producer, so a slow consumer only ever sees fresh frames and latency stays bounded
+class LatestQueue:
+    def __init__(self, maxsize=1):
+        self.items = deque(maxlen=maxsize)
+        self.condition = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item):
+        with self.condition:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify()
+
+    # waits up to timeout seconds for an item, returns None if nothing arrived
+    def get(self, timeout=None):
+        with self.condition:
+            if not self.items:
+                self.condition.wait(timeout)
+            if not self.items:
+                return None
+            return self.items.popleft()
+
+    # returns the newest item and discards anything older, or None if the queue is empty
+    def get_latest(self):
+        with self.condition:
+            if not self.items:
+                return None
+            item = self.items.pop()
+            self.dropped += len(self.items)
+            self.items.clear()
+            return item
+
+
+# Runs capture, inference and rendering each on its own worker thread connected by latest-frame-wins queues.
+# read_frame() -> (success, image), process_frame(image, timestamp) -> frame dict, render_frame(frame) -> frame dict.
+# timestamp is the time.monotonic() of the capture so dwell times are measured from when the frame was taken
+# The Tk thread only calls latest() to pick up the newest finished frame, it never waits on the camera or the model.
+# An optional governor.FrameRateGovernor paces the capture stage.
+# An exception in any stage prints its traceback, stores the failure in error and stops all stages, the Tk thread
+# checks error when it polls
+class Pipeline:
+    def __init__(self, read_frame, process_frame, render_frame, queue_size=1, poll_timeout=0.1, governor=None):
+        self.read_frame = read_frame
+        self.governor = governor
+        self.process_frame = process_frame
+        self.render_frame = render_frame
+        self.poll_timeout = poll_timeout
+
+        self.captured = LatestQueue(queue_size)
+        self.processed = LatestQueue(queue_size)
+        self.rendered = LatestQueue(queue_size)
+
+        self.running = threading.Event()
+        self.threads = []
+        # "<stage>: <exception>" of the first stage that failed, or None
+        self.error = None
+
+    def start(self):
+        self.running.set()
+        for name, step in (("capture", self._capture_step),
+                           ("inference", self._inference_step),
+                           ("render", self._render_step)):
+            thread = threading.Thread(target=self._run, args=(name, step), name=f"pipeline-{name}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        self.running.clear()
+        for thread in self.threads:
+            thread.join(timeout=1)
+        self.threads = []
+
+    def latest(self):
+        return self.rendered.get_latest()
+
+    # number of stale frames thrown away at each stage since start
+    def dropped_frames(self):
+        return {
+            "capture": self.captured.dropped,
+            "inference": self.processed.dropped,
+            "render": self.rendered.dropped,
+        }
+
+    # runs one stage's step until the pipeline stops or the step raises
+    def _run(self, name, step):
+        while self.running.is_set():
+            try:
+                step()
+            except Exception as e:
+                print(f"Pipeline {name} stage failed:")
+                traceback.print_exc()
+                if self.error is None:
+                    self.error = f"{name}: {e}"
+                self.running.clear()
+
+    def _capture_step(self):
+        if self.governor:
+            time.sleep(self.governor.next_delay())
+        success, image = self.read_frame()
+        if not success:
+            time.sleep(self.poll_timeout)
+            return
+        self.captured.put((image, time.monotonic()))
+
+    def _inference_step(self):
+        captured = self.captured.get(self.poll_timeout)
+        if captured is not None:
+            self.processed.put(self.process_frame(*captured))
+
+    def _render_step(self):
+        frame = self.processed.get(self.poll_timeout)
+        if frame is not None:
+            self.rendered.put(self.render_frame(frame))
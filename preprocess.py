@@ -0,0 +1,123 @@
+import argparse
+import tracemalloc
+import cv2
+import numpy as np
+
+# Frame preprocessing without per-frame large allocations. The camera reads into preallocated capture buffers
+# (cap.read(image=buffer)) and the flip and colour conversion write into reused destination buffers. Each kind of
+# buffer is a small ring so a frame still in flight in another pipeline stage is not overwritten by the next one;
+# use at least as many buffers as frames can be in flight (2 for the Tk loop, 8 for --pipeline).
+#
+# With mirror_landmarks the pixel flip is skipped before inference: the model sees the camera image as is and the
+# landmark x coordinates (and the handedness labels) are mirrored afterwards, so Hand and the overlay get exactly
+# what they would get from a flipped frame. The flip is then only done for the displayed image, in to_display()
+class FramePreprocessor:
+    def __init__(self, buffers=2, mirror_landmarks=False):
+        self.buffers = buffers
+        self.mirror_landmarks = mirror_landmarks
+        self.rings = {}
+
+    # next buffer of the named ring, (re)allocated only when the frame shape changes
+    def next_buffer(self, name, shape):
+        ring = self.rings.get(name)
+        if ring is None or ring["shape"] != shape:
+            ring = self.rings[name] = {
+                "shape": shape,
+                "arrays": [np.empty(shape, dtype=np.uint8) for _ in range(self.buffers)],
+                "index": 0,
+            }
+        buffer = ring["arrays"][ring["index"]]
+        ring["index"] = (ring["index"] + 1) % self.buffers
+        return buffer
+
+    def read(self, cap):
+        ring = self.rings.get("capture")
+        if ring is None:
+            success, image = cap.read()
+            if success:
+                # adopt the first frame's shape, later frames are read straight into the ring
+                self.next_buffer("capture", image.shape)[...] = image
+            return success, image
+        return cap.read(image=self.next_buffer("capture", ring["shape"]))
+
+    # RGB image for the hand model, mirrored unless mirror_landmarks defers the flip to the landmarks
+    def to_model_input(self, image):
+        rgb = self.next_buffer("rgb", image.shape)
+        if self.mirror_landmarks:
+            return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=rgb)
+        flipped = self.next_buffer("flip", image.shape)
+        cv2.flip(image, 1, dst=flipped)
+        return cv2.cvtColor(flipped, cv2.COLOR_BGR2RGB, dst=rgb)
+
+    # mirrors the model output in place so it matches a flipped frame
+    def mirror_results(self, results):
+        if not self.mirror_landmarks or not results.multi_hand_landmarks:
+            return results
+        for hand_landmarks in results.multi_hand_landmarks:
+            for landmark in hand_landmarks.landmark:
+                landmark.x = 1 - landmark.x
+        for handedness in results.multi_handedness or []:
+            for classification in handedness.classification:
+                classification.label = "Left" if classification.label == "Right" else "Right"
+        return results
+
+    # the image to draw the overlay on and show, flipped here when the flip was skipped for inference
+    def to_display(self, rgb):
+        if not self.mirror_landmarks:
+            return rgb
+        display = self.next_buffer("display", rgb.shape)
+        return cv2.flip(rgb, 1, dst=display)
+
+
+# Runs the preprocessing on synthetic frames and reports the Python/NumPy allocations made in steady state, as traced
+# by tracemalloc. Any block as large as a frame means a per-frame allocation slipped back in
+def measure_allocations(preprocessor, shape=(720, 1280, 3), frames=100, warmup=5):
+    class SyntheticCapture:
+        def __init__(self):
+            self.frame = np.random.default_rng(0).integers(0, 255, shape, dtype=np.uint8)
+
+        def read(self, image=None):
+            if image is None:
+                return True, self.frame.copy()
+            image[...] = self.frame
+            return True, image
+
+    cap = SyntheticCapture()
+    for _ in range(warmup):
+        success, image = preprocessor.read(cap)
+        preprocessor.to_display(preprocessor.to_model_input(image))
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(frames):
+        success, image = preprocessor.read(cap)
+        preprocessor.to_display(preprocessor.to_model_input(image))
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    grown = sum(stat.size_diff for stat in after.compare_to(before, "lineno") if stat.size_diff > 0)
+    frame_bytes = int(np.prod(shape))
+    return {
+        "frames": frames,
+        "frame_bytes": frame_bytes,
+        "traced_peak_bytes": peak,
+        "retained_growth_bytes": grown,
+        "large_allocations": peak >= frame_bytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that frame preprocessing allocates no frame-sized arrays")
+    parser.add_argument("--mirror-landmarks", action="store_true")
+    parser.add_argument("--frames", type=int, default=100)
+    args = parser.parse_args()
+
+    report = measure_allocations(FramePreprocessor(mirror_landmarks=args.mirror_landmarks), frames=args.frames)
+    print(report)
+    if report["large_allocations"]:
+        raise SystemExit("frame-sized allocations found in steady state")
+
+
+if __name__ == "__main__":
+    main()
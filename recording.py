@@ -0,0 +1,88 @@
+import os
+import numpy as np
+from hand import GESTURE_NAMES
+
+# Append-only landmark session format: a 16 byte header followed by fixed-size little-endian records, one per frame.
+# Because every record has the same size the file can be opened zero-copy as a NumPy memmap and hours of sessions
+# can be sliced or replayed without parsing anything
+MAGIC = b"GLMK"
+VERSION = 1
+HEADER_SIZE = 16
+
+RECORD_DTYPE = np.dtype([
+    ("timestamp", "<f8"),            # time.monotonic() of the capture, seconds
+    ("handedness", "i1"),            # 0 = no hand, 1 = Left, 2 = Right
+    ("gesture", "i1"),               # index into hand.GESTURE_NAMES, -1 when no hand was seen
+    ("landmarks", "<f4", (21, 3)),   # x, y, z of the 21 MediaPipe landmarks, NaN when no hand was seen
+])
+
+HANDEDNESS_CODES = {"Left": 1, "Right": 2}
+GESTURE_CODES = {name: code for code, name in enumerate(GESTURE_NAMES)}
+
+
+def header():
+    return MAGIC + VERSION.to_bytes(2, "little") + RECORD_DTYPE.itemsize.to_bytes(2, "little") + bytes(HEADER_SIZE - 8)
+
+
+# Appends to an existing session file (after checking its header) unless append is False, which starts it over
+class SessionRecorder:
+    def __init__(self, path, append=True):
+        new_file = not append or not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new_file:
+            check_header(path)
+        self.file = open(path, "wb" if new_file else "ab")
+        if new_file:
+            self.file.write(header())
+        # a single record buffer reused for every frame so recording allocates nothing per frame
+        self.record_buffer = np.zeros(1, dtype=RECORD_DTYPE)
+        self.record = self.record_buffer[0]
+        self.frames = 0
+
+    # hand_landmarks can be a MediaPipe hand, a (21, 3) array or None when no hand was seen
+    def write(self, timestamp, hand_landmarks=None, handedness=None, gesture=None):
+        record = self.record
+        record["timestamp"] = timestamp
+        record["handedness"] = HANDEDNESS_CODES.get(handedness, 0)
+        record["gesture"] = GESTURE_CODES.get(gesture, -1)
+        if hand_landmarks is None:
+            record["landmarks"] = np.nan
+        elif isinstance(hand_landmarks, np.ndarray):
+            record["landmarks"] = hand_landmarks
+        else:
+            landmarks = record["landmarks"]
+            for index, landmark in enumerate(hand_landmarks.landmark):
+                landmarks[index] = (landmark.x, landmark.y, landmark.z)
+        self.file.write(self.record_buffer.data)
+        self.frames += 1
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def check_header(path):
+    with open(path, "rb") as f:
+        data = f.read(HEADER_SIZE)
+    if data[:4] != MAGIC:
+        raise ValueError(f"{path} is not a landmark session file")
+    version = int.from_bytes(data[4:6], "little")
+    record_size = int.from_bytes(data[6:8], "little")
+    if version != VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"{path} uses session format {version} with {record_size} byte records, expected {VERSION}")
+
+
+# opens a session file as a read-only structured memmap, a partially written last record is ignored
+def open_session(path):
+    check_header(path)
+    count = (os.path.getsize(path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+
+
+# returns the (N,) timestamps and (N, 21, 3) landmarks of a session file as zero-copy views
+def load_recording(path):
+    records = open_session(path)
+    return records["timestamp"], records["landmarks"]
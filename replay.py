@@ -0,0 +1,234 @@
+import argparse
+import json
+import time
+import numpy as np
+from gesture_handler import GestureHandler
+from gesture_model import GestureModel
+from hand import GESTURE_NAMES, classify_landmarks, landmarks_to_array
+from recording import load_recording
+from smoothing import make_filter
+
+# Headless replay of recorded landmark sequences or video files through the recognition path
+# (recognize_gesture -> process_gesture -> handle_gesture / handle_initializing) with no Tk window, camera or audio.
+# Reports throughput, per-stage timings and the time-to-decision of every dwell confirmation so hardware can be
+# sized and throughput regressions caught on a headless CI box
+
+# a gesture not seen for this long starts a new attempt when measuring the realised time to a decision
+ATTEMPT_GAP_S = 1.0
+
+# summarizes a list of per-frame stage durations (seconds) in milliseconds
+def stage_summary(durations):
+    if not durations:
+        return {"calls": 0}
+    durations_ms = np.asarray(durations) * 1000
+    return {
+        "calls": len(durations),
+        "mean_ms": float(durations_ms.mean()),
+        "p50_ms": float(np.percentile(durations_ms, 50)),
+        "p95_ms": float(np.percentile(durations_ms, 95)),
+        "max_ms": float(durations_ms.max()),
+    }
+
+# loads a landmark session: a recording made with main.py --record, or an .npz with "timestamps" (N,) in seconds
+# and "landmarks" (N, 21, 3). Frames without a hand have NaN landmarks
+def load_session(path):
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            return data["timestamps"], data["landmarks"]
+    return load_recording(path)
+
+# classifies every frame of a session once per margin and returns how often each gesture was seen,
+# used to tune the margin passed to GestureHandler offline
+def sweep_margins(landmarks, margins):
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    landmarks = landmarks[~np.isnan(landmarks).any(axis=(1, 2))]
+    sweep = {}
+    for margin in margins:
+        counts = np.bincount(classify_landmarks(landmarks, margin), minlength=len(GESTURE_NAMES))
+        sweep[str(margin)] = {name: int(count) for name, count in zip(GESTURE_NAMES, counts)}
+    return sweep
+
+
+# Every decision is reported with its threshold and its realised latency: the time from the first frame the raw
+# (unfiltered) classifier saw the gesture in this attempt to the decision. Dwell restarts caused by flickering frames
+# and the lag of a landmark filter both show up as realised_ms above threshold_ms
+class ReplayRunner:
+    def __init__(self, margin=0.05, smoothing=None, **handler_options):
+        self.margin = margin
+        # smoothing.make_filter name, every handler gets a fresh filter
+        self.smoothing = smoothing
+        # forwarded to GestureHandler, e.g. dwell_ms, min_samples or hysteresis when tuning thresholds offline
+        self.handler_options = handler_options
+        # gesture -> (attempt start, last seen) timestamps of the raw classifier since the last decision
+        self.attempts = {}
+
+    def new_handler(self):
+        self.attempts = {}
+        return GestureHandler(self.margin, mute=True, landmark_filter=make_filter(self.smoothing), **self.handler_options)
+
+    def track_attempt(self, gesture, timestamp):
+        started, last_seen = self.attempts.get(gesture, (timestamp, timestamp))
+        if timestamp - last_seen > ATTEMPT_GAP_S:
+            started = timestamp
+        self.attempts[gesture] = (started, timestamp)
+
+    # replays (N,) timestamps and (N, 21, 3) landmarks. With batch=True every frame is classified up front in one
+    # vectorized call and only the dwell state machine runs per frame. Smoothing and hysteresis depend on the previous
+    # frames, with either of them the frames are classified one by one and the batch only measures the raw gestures
+    def replay_landmarks(self, timestamps, landmarks, batch=False):
+        handler = self.new_handler()
+        stateful = handler.landmark_filter is not None or handler.hysteresis
+        stages = {"classify": [], "handle": []}
+        decisions = []
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        has_hand = ~np.isnan(landmarks).any(axis=(1, 2))
+
+        # the raw gestures of every frame, for the attempt tracking. Only timed when they are the batch classification,
+        # the one by one path does not pay for them in the app
+        if not batch:
+            codes = handler.recognize_gestures(np.nan_to_num(landmarks))
+        start = time.perf_counter()
+        if batch:
+            codes = handler.recognize_gestures(np.nan_to_num(landmarks))
+            stages["classify"].append(time.perf_counter() - start)
+
+        for index, timestamp in enumerate(timestamps):
+            if not has_hand[index]:
+                continue
+            self.track_attempt(GESTURE_NAMES[codes[index]], float(timestamp))
+            if batch and not stateful:
+                gesture = GESTURE_NAMES[codes[index]]
+            else:
+                stage_start = time.perf_counter()
+                gesture = handler.recognize_gesture(landmarks[index], float(timestamp))
+                stages["classify"].append(time.perf_counter() - stage_start)
+
+            stage_start = time.perf_counter()
+            handler.process_gesture(gesture, float(timestamp))
+            stages["handle"].append(time.perf_counter() - stage_start)
+            self.record_decision(handler, decisions)
+
+        return self.report(len(timestamps), time.perf_counter() - start, stages, decisions)
+
+    # runs a video file through MediaPipe and the recognition path, timestamps come from the video's own clock
+    def replay_video(self, path, hands_options=None):
+        import cv2
+        import mediapipe as mp
+
+        handler = self.new_handler()
+        stages = {"decode": [], "preprocess": [], "inference": [], "classify": [], "handle": []}
+        decisions = []
+        frames = 0
+
+        cap = cv2.VideoCapture(path)
+        hands = mp.solutions.hands.Hands(**(hands_options or {"max_num_hands": 1}))
+        start = time.perf_counter()
+        try:
+            while True:
+                stage_start = time.perf_counter()
+                success, image = cap.read()
+                if not success:
+                    break
+                timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                stages["decode"].append(time.perf_counter() - stage_start)
+                frames += 1
+
+                stage_start = time.perf_counter()
+                image = cv2.cvtColor(cv2.flip(image, 1), cv2.COLOR_BGR2RGB)
+                stages["preprocess"].append(time.perf_counter() - stage_start)
+
+                stage_start = time.perf_counter()
+                results = hands.process(image)
+                stages["inference"].append(time.perf_counter() - stage_start)
+                if not results.multi_hand_landmarks:
+                    continue
+
+                raw_code = handler.recognize_gestures(landmarks_to_array(results.multi_hand_landmarks[0]))
+                self.track_attempt(GESTURE_NAMES[raw_code], timestamp)
+                stage_start = time.perf_counter()
+                gesture = handler.recognize_gesture(results.multi_hand_landmarks[0], timestamp)
+                stages["classify"].append(time.perf_counter() - stage_start)
+
+                stage_start = time.perf_counter()
+                handler.process_gesture(gesture, timestamp)
+                stages["handle"].append(time.perf_counter() - stage_start)
+                self.record_decision(handler, decisions)
+        finally:
+            hands.close()
+            cap.release()
+
+        return self.report(frames, time.perf_counter() - start, stages, decisions)
+
+    def record_decision(self, handler, decisions):
+        event = handler.last_event
+        if event is None:
+            return
+        dwell = handler.initial_dwell if event["kind"] == "initialized" else handler.dwell
+        attempt_started, _ = self.attempts.get(event["gesture"], (event["started"], None))
+        self.attempts = {}
+        decisions.append({
+            "kind": event["kind"],
+            "gesture": event["gesture"],
+            "timestamp": event["timestamp"],
+            "time_to_decision_ms": event["elapsed_ms"],
+            "threshold_ms": dwell.thresholds_ms[event["gesture"]],
+            "realised_ms": (event["timestamp"] - min(attempt_started, event["started"])) * 1000,
+            "samples": event["samples"],
+            "current_floor": event["current_floor"],
+            "predicted_floor": event["predicted_floor"],
+        })
+
+    def report(self, frames, seconds, stages, decisions):
+        overruns = np.array([decision["realised_ms"] - decision["threshold_ms"] for decision in decisions])
+        return {
+            "frames": frames,
+            "seconds": seconds,
+            "fps": frames / seconds if seconds > 0 else 0.0,
+            "stages": {name: stage_summary(durations) for name, durations in stages.items()},
+            "decisions": decisions,
+            "confirmed_floors": [decision["current_floor"] for decision in decisions
+                                 if decision["kind"] == "floor_confirmed"],
+            # how much longer than the configured thresholds the gestures really had to be held
+            "overrun_ms": {
+                "mean": float(overruns.mean()) if len(overruns) else 0.0,
+                "p95": float(np.percentile(overruns, 95)) if len(overruns) else 0.0,
+                "max": float(overruns.max()) if len(overruns) else 0.0,
+            },
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded landmarks or a video through the gesture recognizer")
+    parser.add_argument("source", help="landmark session (.lmk recording or .npz) or video file")
+    parser.add_argument("--margin", type=float, default=0.05)
+    parser.add_argument("--batch", action="store_true", help="classify all landmark frames in one vectorized call")
+    parser.add_argument("--smoothing", choices=("none", "ema", "one-euro"), default="none",
+                        help="temporal landmark filter applied before classification")
+    parser.add_argument("--hysteresis", type=float, default=0.0,
+                        help="slack for fingers to keep their up/down state, in image heights (keep below --margin)")
+    parser.add_argument("--sweep-margins", type=float, nargs="+",
+                        help="also report the gesture distribution of the session for each of these margins")
+    parser.add_argument("--model", help="trained gesture model (.npz from calibrate.py) to use instead of the finger rules")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    classifier = GestureModel.load(args.model) if args.model else None
+    runner = ReplayRunner(args.margin, smoothing=args.smoothing, hysteresis=args.hysteresis, classifier=classifier)
+    if args.source.endswith((".npz", ".lmk")):
+        timestamps, landmarks = load_session(args.source)
+        report = runner.replay_landmarks(timestamps, landmarks, batch=args.batch)
+        if args.sweep_margins:
+            report["margin_sweep"] = sweep_margins(landmarks, args.sweep_margins)
+    else:
+        report = runner.replay_video(args.source)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
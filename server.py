@@ -0,0 +1,230 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import cv2
+import mediapipe as mp
+from gesture_handler import GestureHandler
+from pipeline import LatestQueue
+
+# Multi-camera server: one process per core (at most one per stream) runs MediaPipe inference for a share of the
+# streams. Every stream keeps its own capture, hand model and GestureHandler, so dwell state and floor counters are
+# independent, and all floor selection events are multiplexed onto one output as JSON lines. Live cameras are read
+# by their own capture thread into a latest-frame-wins queue, so a stalled camera only stops its own stream and never
+# blocks the other streams sharing its worker. That thread also opens the capture, an unreachable stream URL can take
+# tens of seconds to fail. A source that cannot be opened (a mistyped path looks like a stream URL) ends its stream
+# with a stream_error event. A live source that stops delivering frames for MAX_FAILED_READS reads in a row is
+# reopened until it is back, with stream_reconnecting and stream_reconnected events
+
+MAX_FAILED_READS = 50
+READ_RETRY_S = 0.1
+RECONNECT_DELAY_S = 2.0
+
+# a camera index ("0") or a stream URL is live, anything that exists on disk is a recorded video
+def is_live(source):
+    return source.isdigit() or not os.path.isfile(source)
+
+def open_capture(source):
+    return cv2.VideoCapture(int(source) if source.isdigit() else source)
+
+def assign_streams(sources, workers):
+    groups = [[] for _ in range(workers)]
+    for index, source in enumerate(sources):
+        groups[index % workers].append((f"stream{index}", source))
+    return [group for group in groups if group]
+
+
+class Stream:
+    def __init__(self, stream_id, source, hands_options, margin, events):
+        self.stream_id = stream_id
+        self.source = source
+        self.live = is_live(source)
+        self.hands_options = hands_options
+        # the worker's event queue, the capture thread of a live stream reports to it directly
+        self.events = events
+        # set up by start() from the worker loop, a live capture is opened and owned by its capture thread
+        self.cap = None
+        self.hands = None
+        self.gesture_handler = GestureHandler(margin, mute=True)
+        self.frames = 0
+        self.started = None
+        self.ended = False
+        self.frames_queue = LatestQueue(1)
+
+    # starts the stream, a recorded video is opened right away (a local file does not block), a live source by its
+    # capture thread. Ends the stream with a stream_error event if the video cannot be opened
+    def start(self):
+        self.started = time.monotonic()
+        if not self.live:
+            self.cap = open_capture(self.source)
+            if not self.cap.isOpened():
+                self.fail(f"could not open {self.source}")
+                return
+        self.hands = mp.solutions.hands.Hands(**self.hands_options)
+        if self.live:
+            threading.Thread(target=self._capture_loop, name=f"capture-{self.stream_id}", daemon=True).start()
+
+    def fail(self, error):
+        self.ended = True
+        self.events.put(self.event("stream_error", error=error))
+
+    def _capture_loop(self):
+        cap = self.cap = open_capture(self.source)
+        if not cap.isOpened():
+            cap.release()
+            self.fail(f"could not open {self.source}")
+            return
+        failed_reads = 0
+        while not self.ended:
+            success, image = cap.read()
+            if success:
+                failed_reads = 0
+                self.frames_queue.put((image, time.monotonic()))
+                continue
+            failed_reads += 1
+            if failed_reads < MAX_FAILED_READS:
+                time.sleep(READ_RETRY_S)
+                continue
+            # the camera dropped out, it worked before so it is reopened until it is back
+            self.events.put(self.event("stream_reconnecting", failed_reads=failed_reads))
+            cap.release()
+            cap = self.cap = open_capture(self.source)
+            while not cap.isOpened() and not self.ended:
+                cap.release()
+                time.sleep(RECONNECT_DELAY_S)
+                cap = self.cap = open_capture(self.source)
+            if cap.isOpened():
+                self.events.put(self.event("stream_reconnected"))
+            failed_reads = 0
+        cap.release()
+
+    # newest frame of a live stream (None if nothing new), or the next frame of a recorded video
+    def next_frame(self):
+        if self.live:
+            return self.frames_queue.get_latest()
+        success, image = self.cap.read()
+        if not success:
+            self.ended = True
+            return None
+        return image, self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+
+    # runs the hand model and the gesture state machine on one frame, returns the decision event if there is one
+    def process(self, image, timestamp):
+        self.frames += 1
+        results = self.hands.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        if not results.multi_hand_landmarks:
+            return None
+        gesture = self.gesture_handler.recognize_gesture(results.multi_hand_landmarks[0])
+        self.gesture_handler.process_gesture(gesture, timestamp)
+        return self.gesture_handler.last_event
+
+    def event(self, kind, **fields):
+        return {"stream": self.stream_id, "source": self.source, "kind": kind, **fields}
+
+    def close(self):
+        self.ended = True
+        if self.hands is not None:
+            self.hands.close()
+        # a live capture is released by its own thread, which may still be reading from it
+        if self.cap is not None and not self.live:
+            self.cap.release()
+
+
+def worker_main(streams, events, stop, hands_options, margin):
+    streams = [Stream(stream_id, source, hands_options, margin, events) for stream_id, source in streams]
+    try:
+        while not stop.is_set() and not all(stream.ended for stream in streams):
+            idle = True
+            for stream in streams:
+                if stream.ended:
+                    continue
+                if stream.started is None:
+                    idle = False
+                    stream.start()
+                    continue
+                frame = stream.next_frame()
+                if frame is None:
+                    # a live stream only ends through stream_error
+                    if stream.ended and not stream.live:
+                        elapsed = time.monotonic() - stream.started
+                        events.put(stream.event("stream_ended", frames=stream.frames,
+                                                fps=stream.frames / elapsed if elapsed > 0 else 0.0))
+                    continue
+                idle = False
+                event = stream.process(*frame)
+                if event is not None:
+                    events.put(stream.event(event["kind"], gesture=event["gesture"], timestamp=event["timestamp"],
+                                            elapsed_ms=event["elapsed_ms"], current_floor=event["current_floor"],
+                                            predicted_floor=event["predicted_floor"]))
+            # every live stream was waiting on its camera
+            if idle:
+                time.sleep(0.002)
+    finally:
+        for stream in streams:
+            stream.close()
+
+
+class MultiCameraServer:
+    def __init__(self, sources, workers=None, hands_options=None, margin=0.05):
+        self.sources = list(sources)
+        self.workers = min(workers or os.cpu_count() or 1, len(self.sources))
+        self.hands_options = hands_options or {"max_num_hands": 1}
+        self.margin = margin
+        # spawn so every worker gets a clean MediaPipe runtime
+        self.context = multiprocessing.get_context("spawn")
+        self.events_queue = self.context.Queue()
+        self.stop_event = self.context.Event()
+        self.processes = []
+
+    def start(self):
+        for group in assign_streams(self.sources, self.workers):
+            process = self.context.Process(target=worker_main, daemon=True,
+                                           args=(group, self.events_queue, self.stop_event,
+                                                 self.hands_options, self.margin))
+            process.start()
+            self.processes.append(process)
+
+    # yields the events of every stream as they arrive until all recorded videos ended and all workers exited
+    def events(self):
+        while True:
+            try:
+                yield self.events_queue.get(timeout=0.5)
+            except queue.Empty:
+                if not any(process.is_alive() for process in self.processes):
+                    return
+
+    def stop(self):
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recognize floor selections on several cameras or videos at once")
+    parser.add_argument("sources", nargs="+", help="camera indices, stream URLs or video files")
+    parser.add_argument("--workers", type=int, help="worker processes, defaults to the number of cores")
+    parser.add_argument("--margin", type=float, default=0.05)
+    parser.add_argument("--output", help="append JSON line events here instead of stdout")
+    args = parser.parse_args()
+
+    output = open(args.output, "a") if args.output else sys.stdout
+    server = MultiCameraServer(args.sources, workers=args.workers, margin=args.margin)
+    server.start()
+    try:
+        for event in server.events():
+            output.write(json.dumps(event) + "\n")
+            output.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import mediapipe as mp
+from gesture_handler import GestureHandler
+
+# Headless service for elevator cars without a screen. Capture and recognition run on an asyncio loop with the camera
+# read and the MediaPipe inference offloaded to executor threads, and there is no Tk window, overlay drawing or image
+# flipping at all. The gesture state machine's transitions are published as JSON line events to stdout and/or to
+# every controller connected to a local TCP port. The "kind" field names the event, as in server.py's output:
+#   initialized       the peace sign opened the floor selection
+#   gesture_progress  a gesture is being held, progress is 0..1 towards its threshold
+#   floor_changed     a held gesture changed the predicted floor
+#   floor_confirmed   the peace sign confirmed the predicted floor
+# Events are never awaited on a controller, a controller that stops reading and lets more than MAX_BUFFERED_BYTES
+# queue up is hung up on instead, so it cannot grow the send buffer without bound or stall the recognition
+
+MAX_BUFFERED_BYTES = 256 * 1024
+
+class GestureService:
+    def __init__(self, source=0, margin=0.05, hands_options=None, stdout=True, progress_step=0.25):
+        self.source = source
+        self.margin = margin
+        self.hands_options = hands_options or {"max_num_hands": 1}
+        self.stdout = stdout
+        # gesture_progress is only published when progress crosses another step, not on every frame
+        self.progress_step = progress_step
+        self.last_progress = (None, 0)
+        self.writers = set()
+        self.frames = 0
+        self.running = False
+
+    async def serve(self, host, port):
+        return await asyncio.start_server(self._on_controller, host, port)
+
+    async def _on_controller(self, reader, writer):
+        self.writers.add(writer)
+        try:
+            # controllers only listen, wait until they hang up
+            await reader.read()
+        except ConnectionError:
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    # flushes and hangs up on every controller so they see the end of the event stream
+    async def close_controllers(self):
+        for writer in list(self.writers):
+            writer.close()
+            await writer.wait_closed()
+        # let the controller handlers notice the closed connections before the server goes away
+        await asyncio.sleep(0.1)
+
+    def publish(self, event):
+        line = json.dumps(event) + "\n"
+        if self.stdout:
+            sys.stdout.write(line)
+            sys.stdout.flush()
+        for writer in list(self.writers):
+            if writer.is_closing():
+                self.writers.discard(writer)
+                continue
+            if writer.transport.get_write_buffer_size() > MAX_BUFFERED_BYTES:
+                print(f"Dropping controller {writer.get_extra_info('peername')}: it stopped reading events",
+                      file=sys.stderr)
+                self.writers.discard(writer)
+                writer.transport.abort()
+                continue
+            writer.write(line.encode())
+
+    def publish_progress(self, gesture_handler, timestamp):
+        dwell = gesture_handler.initial_dwell if gesture_handler.initializing else gesture_handler.dwell
+        if dwell.gesture is None:
+            self.last_progress = (None, 0)
+            return
+        step = int(dwell.progress() / self.progress_step)
+        if (dwell.gesture, step) != self.last_progress:
+            self.last_progress = (dwell.gesture, step)
+            self.publish({"kind": "gesture_progress", "gesture": dwell.gesture, "timestamp": timestamp,
+                          "progress": round(dwell.progress(), 2)})
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        # capture and inference each get their own thread so the next frame is read while the current one is inferred
+        capture_executor = ThreadPoolExecutor(1, thread_name_prefix="capture")
+        inference_executor = ThreadPoolExecutor(1, thread_name_prefix="inference")
+        cap = cv2.VideoCapture(self.source)
+        # a recorded video is played once with its own clock, a camera is read until stop() with the wall clock
+        recorded = isinstance(self.source, str) and os.path.isfile(self.source)
+        hands = mp.solutions.hands.Hands(**self.hands_options)
+        gesture_handler = GestureHandler(self.margin, mute=True)
+        self.running = True
+
+        try:
+            next_frame = loop.run_in_executor(capture_executor, read_frame, cap, recorded)
+            while self.running:
+                success, image, timestamp = await next_frame
+                if not success:
+                    if recorded:
+                        break
+                    await asyncio.sleep(0.1)
+                    next_frame = loop.run_in_executor(capture_executor, read_frame, cap, recorded)
+                    continue
+                next_frame = loop.run_in_executor(capture_executor, read_frame, cap, recorded)
+
+                self.frames += 1
+                results = await loop.run_in_executor(inference_executor, process_image, hands, image)
+                if not results.multi_hand_landmarks:
+                    continue
+
+                gesture = gesture_handler.recognize_gesture(results.multi_hand_landmarks[0])
+                gesture_handler.process_gesture(gesture, timestamp)
+                event = gesture_handler.last_event
+                if event is not None:
+                    self.last_progress = (None, 0)
+                    self.publish({"kind": event["kind"], "gesture": event["gesture"], "timestamp": timestamp,
+                                  "elapsed_ms": event["elapsed_ms"], "current_floor": event["current_floor"],
+                                  "predicted_floor": event["predicted_floor"]})
+                else:
+                    self.publish_progress(gesture_handler, timestamp)
+        finally:
+            self.running = False
+            capture_executor.shutdown(wait=True)
+            inference_executor.shutdown(wait=True)
+            hands.close()
+            cap.release()
+
+    def stop(self):
+        self.running = False
+
+
+def read_frame(cap, recorded):
+    success, image = cap.read()
+    timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000 if recorded else time.monotonic()
+    return success, image, timestamp
+
+
+def process_image(hands, image):
+    return hands.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+
+
+async def run_service(args):
+    source = int(args.source) if args.source.isdigit() else args.source
+    service = GestureService(source, margin=args.margin, stdout=not args.quiet)
+    if args.port:
+        server = await service.serve(args.host, args.port)
+        async with server:
+            try:
+                await service.run()
+            finally:
+                await service.close_controllers()
+    else:
+        await service.run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless gesture recognition service that publishes floor events")
+    parser.add_argument("--source", default="0", help="camera index, stream URL or video file")
+    parser.add_argument("--margin", type=float, default=0.05)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="publish events to controllers connecting on this TCP port")
+    parser.add_argument("--quiet", action="store_true", help="do not print events to stdout")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run_service(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
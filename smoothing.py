@@ -0,0 +1,84 @@
+import math
+import numpy as np
+
+# Temporal landmark filters applied to each hand's (21, 3) landmark array before it is classified. A few pixels of
+# MediaPipe jitter are enough to break one of the strict tip -> dip -> pip -> mcp chains for a single frame, which turns
+# the frame into "Neutral" and can restart a dwell. Both filters work on the whole array at once and restart from the
+# raw landmarks when no hand was seen for reset_after seconds, so a new hand never inherits an old hand's position.
+# Call them as filter(landmarks, timestamp) with monotonic timestamps in seconds
+
+# Exponential moving average, alpha is the weight of the newest frame (1 disables smoothing). Cheapest, but it lags
+# fast moves as much as slow ones and the amount of smoothing depends on the frame rate
+class ExponentialFilter:
+    def __init__(self, alpha=0.5, reset_after=0.25):
+        self.alpha = alpha
+        self.reset_after = reset_after
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.last_timestamp = None
+
+    def __call__(self, landmarks, timestamp):
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        if self.value is None or timestamp - self.last_timestamp > self.reset_after:
+            self.value = landmarks.copy()
+        else:
+            self.value += self.alpha * (landmarks - self.value)
+        self.last_timestamp = timestamp
+        return self.value.copy()
+
+
+# One Euro filter (Casiez et al., CHI 2012): an exponential filter whose cutoff frequency rises with the speed of each
+# coordinate, so a held hand is smoothed hard while a moving hand is followed with little lag. It uses the real time
+# between frames, the same settings behave the same at 12 and 60 fps. min_cutoff (Hz) sets the smoothing at rest, beta
+# how quickly the cutoff opens up with speed in image widths per second, d_cutoff (Hz) smooths the speed estimate
+class OneEuroFilter:
+    def __init__(self, min_cutoff=1.0, beta=10.0, d_cutoff=1.0, reset_after=0.25):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset_after = reset_after
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.speed = None
+        self.last_timestamp = None
+
+    def __call__(self, landmarks, timestamp):
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        elapsed = None if self.last_timestamp is None else timestamp - self.last_timestamp
+        if self.value is None or elapsed > self.reset_after:
+            self.value = landmarks.copy()
+            self.speed = np.zeros_like(landmarks)
+            self.last_timestamp = timestamp
+            return self.value.copy()
+        if elapsed <= 0:
+            return self.value.copy()
+
+        self.last_timestamp = timestamp
+        self.speed += smoothing_factor(self.d_cutoff, elapsed) * ((landmarks - self.value) / elapsed - self.speed)
+        cutoff = self.min_cutoff + self.beta * np.abs(self.speed)
+        self.value += smoothing_factor(cutoff, elapsed) * (landmarks - self.value)
+        return self.value.copy()
+
+
+# weight of the newest sample for a first order low-pass filter with this cutoff (Hz, scalar or array) after elapsed
+# seconds
+def smoothing_factor(cutoff, elapsed):
+    return 1.0 / (1.0 + 1.0 / (2 * math.pi * cutoff * elapsed))
+
+
+FILTERS = {
+    "ema": ExponentialFilter,
+    "one-euro": OneEuroFilter,
+}
+
+# builds a filter by its command line name, "none" (or None) means no smoothing
+def make_filter(name, **options):
+    if name in (None, "none"):
+        return None
+    if name not in FILTERS:
+        raise ValueError(f"unknown landmark filter {name!r}, expected one of: none, {', '.join(FILTERS)}")
+    return FILTERS[name](**options)
@@ -0,0 +1,91 @@
+import threading
+import time
+
+# Per-phase startup timing. Phases are timed on whatever thread runs them, marks are points in time (window shown,
+# ready) measured from `started`, which main.py takes before its first import. Time spent before Python runs at all
+# (e.g. the PyInstaller --onefile bootloader unpacking the bundle) is not visible from here and comes on top
+class StartupProfile:
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self.phases = {}
+        self.marks = {}
+        self.lock = threading.Lock()
+
+    def phase(self, name):
+        return PhaseTimer(self, name)
+
+    def record(self, name, seconds):
+        with self.lock:
+            self.phases[name] = seconds
+
+    def mark(self, name):
+        with self.lock:
+            self.marks.setdefault(name, time.perf_counter() - self.started)
+
+    def report(self):
+        with self.lock:
+            return {"phases": dict(self.phases), "marks": dict(self.marks)}
+
+    def summary_line(self):
+        report = self.report()
+        parts = [f"{name} {seconds:.2f} s" for name, seconds in report["phases"].items()]
+        parts += [f"{name} at {seconds:.2f} s" for name, seconds in report["marks"].items()]
+        return "startup: " + ", ".join(parts)
+
+
+class PhaseTimer:
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+# Runs the slow startup phases off the Tk thread. tasks is a list of task lists, each task list is a sequence of
+# (phase name, function) run in order on its own thread, so independent work (opening the camera vs. loading the
+# model) overlaps. ready is set once every thread finished, errors holds (phase, exception) for the phases that failed,
+# a task list stops at its first failure
+class Warmup:
+    def __init__(self, profile, tasks):
+        self.profile = profile
+        self.tasks = tasks
+        self.ready = threading.Event()
+        self.errors = []
+        self.pending = len(tasks)
+        self.lock = threading.Lock()
+
+    def start(self):
+        if not self.tasks:
+            self.ready.set()
+        for index, steps in enumerate(self.tasks):
+            threading.Thread(target=self._run, args=(steps,), name=f"warmup-{index}", daemon=True).start()
+
+    # runs every phase on the calling thread, for the blocking startup
+    def run(self):
+        for steps in self.tasks:
+            self._run(steps)
+        self.ready.set()
+
+    def _run(self, steps):
+        try:
+            for name, function in steps:
+                with self.profile.phase(name):
+                    try:
+                        function()
+                    except Exception as e:
+                        print(f"Startup phase {name} failed: {e}")
+                        with self.lock:
+                            self.errors.append((name, e))
+                        return
+        finally:
+            with self.lock:
+                self.pending -= 1
+                if self.pending == 0:
+                    self.ready.set()
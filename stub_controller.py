@@ -0,0 +1,49 @@
+import argparse
+import asyncio
+import json
+
+# Stand-in for the elevator controller, used to test service.py without real hardware. It connects to the service's
+# TCP port, prints every event and keeps the floor the car would be sent to
+async def listen(host, port, retry_seconds=10):
+    deadline = asyncio.get_running_loop().time() + retry_seconds
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            break
+        except OSError:
+            if asyncio.get_running_loop().time() > deadline:
+                raise
+            await asyncio.sleep(0.5)
+
+    confirmed_floors = []
+    try:
+        async for line in reader:
+            event = json.loads(line)
+            if event["kind"] == "gesture_progress":
+                print(f"{event['gesture']}: {event['progress']:.0%}")
+            elif event["kind"] == "initialized":
+                print(f"Selection opened at floor {event['current_floor']}")
+            elif event["kind"] == "floor_changed":
+                print(f"Predicted floor: {event['predicted_floor']}")
+            elif event["kind"] == "floor_confirmed":
+                confirmed_floors.append(event["current_floor"])
+                print(f"Floor confirmed: {event['current_floor']} ({event['elapsed_ms']:.0f} ms hold)")
+    finally:
+        writer.close()
+    return confirmed_floors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub elevator controller that prints the service's floor events")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    try:
+        confirmed_floors = asyncio.run(listen(args.host, args.port))
+        print(f"Confirmed floors: {confirmed_floors}")
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import numpy as np
+from dwell import DwellTracker
+from hand import GESTURE_NAMES, classify_fingers, fingers_pointing
+from smoothing import make_filter
+
+# Multi-hand support for crowded cars. MediaPipe returns the hands of a frame in no particular order, so every hand is
+# matched to a track by the distance of its landmark centroid to the tracks of the previous frames, and each track keeps
+# its own dwell state, landmark filter and finger states for the hysteresis. All hands of a frame are classified in one
+# batched call. The floor selection itself is shared, one GestureHandler holds it and an arbitration policy decides
+# whose gestures drive it:
+#   owner    the hand that opened the selection with the peace sign owns it until the floor is confirmed or the hand
+#            is lost, other hands are ignored meanwhile. Without an owner any hand can take over
+#   largest  the hand closest to the camera (largest on screen) in each frame
+ARBITRATION_POLICIES = ("owner", "largest")
+
+
+# Associates hands with track IDs across frames by greedy nearest centroid matching. A hand further than max_distance
+# (in image widths) from every free track starts a new track, tracks unseen for max_missing_ms are dropped
+class HandTracker:
+    def __init__(self, max_distance=0.15, max_missing_ms=500):
+        self.max_distance = max_distance
+        self.max_missing_ms = max_missing_ms
+        self.tracks = {}
+        self.next_id = 0
+
+    # drops the tracks unseen for max_missing_ms and returns their IDs, also called on frames without any hand
+    def expire(self, timestamp):
+        dropped = [track_id for track_id, track in self.tracks.items()
+                   if (timestamp - track["last_seen"]) * 1000 > self.max_missing_ms]
+        for track_id in dropped:
+            del self.tracks[track_id]
+        return dropped
+
+    # takes an (N, 21, 3) stack of the frame's hands, returns their N track IDs and the IDs of dropped tracks
+    def update(self, landmarks, timestamp):
+        dropped = self.expire(timestamp)
+
+        centroids = landmarks[:, :, :2].mean(axis=1)
+        track_ids = list(self.tracks)
+        assigned = [None] * len(centroids)
+        if track_ids and len(centroids):
+            previous = np.array([self.tracks[track_id]["centroid"] for track_id in track_ids])
+            distances = np.linalg.norm(centroids[:, np.newaxis] - previous[np.newaxis], axis=-1)
+            # closest pairs first, every hand and every track is used once
+            for _ in range(min(distances.shape)):
+                hand_index, track_index = np.unravel_index(distances.argmin(), distances.shape)
+                if distances[hand_index, track_index] > self.max_distance:
+                    break
+                assigned[hand_index] = track_ids[track_index]
+                distances[hand_index, :] = np.inf
+                distances[:, track_index] = np.inf
+
+        for hand_index, centroid in enumerate(centroids):
+            if assigned[hand_index] is None:
+                assigned[hand_index] = self.next_id
+                self.next_id += 1
+            self.tracks[assigned[hand_index]] = {"centroid": centroid, "last_seen": timestamp}
+        return assigned, dropped
+
+
+class MultiHandHandler:
+    def __init__(self, gesture_handler, arbitration="owner", smoothing=None, max_distance=0.15, max_missing_ms=500):
+        if arbitration not in ARBITRATION_POLICIES:
+            raise ValueError(f"unknown arbitration policy {arbitration!r}, expected one of: {', '.join(ARBITRATION_POLICIES)}")
+        self.gesture_handler = gesture_handler
+        self.arbitration = arbitration
+        self.smoothing = smoothing
+        self.tracker = HandTracker(max_distance, max_missing_ms)
+        # track ID -> its own dwell trackers, landmark filter and finger states
+        self.states = {}
+        self.owner = None
+        # decision events of the last process_hands call, each with the track ID that made it
+        self.events = []
+
+    def new_state(self):
+        handler = self.gesture_handler
+        return {
+            "dwell": DwellTracker(handler.dwell.thresholds_ms, handler.dwell.min_samples, handler.dwell.gap_tolerance_ms),
+            "initial_dwell": DwellTracker(handler.initial_dwell.thresholds_ms, handler.initial_dwell.min_samples,
+                                          handler.initial_dwell.gap_tolerance_ms),
+            "filter": make_filter(self.smoothing),
+            # last frame's (up, down) finger states of this hand for the hysteresis, None after a gap
+            "fingers": None,
+            "fingers_time": None,
+        }
+
+    # drops the tracks (and their states) that were not seen for max_missing_ms, on frames with or without hands
+    def expire(self, timestamp):
+        dropped = self.tracker.expire(timestamp)
+        self.forget(dropped)
+        return dropped
+
+    def forget(self, track_ids):
+        for track_id in track_ids:
+            self.states.pop(track_id, None)
+            if track_id == self.owner:
+                self.owner = None
+
+    # gesture codes of all hands in one batched call. With the finger rules and a hysteresis every hand's finger test
+    # gets the slack of its own track's previous frame, a track without one (new, or after a gap) gets none
+    def classify(self, track_ids, landmarks, timestamp):
+        handler = self.gesture_handler
+        if handler.classifier is not None or not handler.hysteresis:
+            return handler.recognize_gestures(landmarks)
+
+        previous_up = np.zeros((len(track_ids), 4), dtype=bool)
+        previous_down = np.zeros((len(track_ids), 4), dtype=bool)
+        for index, track_id in enumerate(track_ids):
+            state = self.states[track_id]
+            if state["fingers"] is not None and (timestamp - state["fingers_time"]) * 1000 <= handler.gap_tolerance_ms:
+                previous_up[index], previous_down[index] = state["fingers"]
+        up, down = fingers_pointing(landmarks, handler.margin, handler.hysteresis, (previous_up, previous_down))
+        for index, track_id in enumerate(track_ids):
+            self.states[track_id]["fingers"] = (up[index], down[index])
+            self.states[track_id]["fingers_time"] = timestamp
+        return classify_fingers(up, down)
+
+    # the tracks allowed to drive the floor selection this frame, in the order they are processed
+    def drivers(self, track_ids, landmarks):
+        if self.arbitration == "largest":
+            extents = landmarks[:, :, :2].max(axis=1) - landmarks[:, :, :2].min(axis=1)
+            return [track_ids[int(np.argmax(extents[:, 0] * extents[:, 1]))]]
+        if self.owner in track_ids:
+            return [self.owner]
+        return sorted(track_ids)
+
+    # processes every hand of one frame. landmarks_list holds one (21, 3) array per hand. Returns one dict per hand
+    # (track_id, gesture, state and show_floor for the overlay, driving) in the input order
+    def process_hands(self, landmarks_list, timestamp):
+        handler = self.gesture_handler
+        self.events = []
+        landmarks = np.stack(landmarks_list)
+        track_ids, dropped = self.tracker.update(landmarks, timestamp)
+        self.forget(dropped)
+
+        for index, track_id in enumerate(track_ids):
+            state = self.states.get(track_id)
+            if state is None:
+                state = self.states[track_id] = self.new_state()
+            if state["filter"] is not None:
+                landmarks[index] = state["filter"](landmarks[index], timestamp)
+        codes = self.classify(track_ids, landmarks, timestamp)
+
+        drivers = self.drivers(track_ids, landmarks)
+        hands = []
+        for index, track_id in enumerate(track_ids):
+            gesture = GESTURE_NAMES[codes[index]]
+            hands.append({"track_id": track_id, "gesture": gesture, "state": "idle", "show_floor": False,
+                          "driving": False})
+
+        for track_id in drivers:
+            index = track_ids.index(track_id)
+            # a track taking over in this frame stops the others from driving in the same frame
+            if self.owner is not None and track_id != self.owner and self.arbitration == "owner":
+                continue
+            state = self.states[track_id]
+            # the handler's dwell trackers are the driving track's own ones while its gesture is processed
+            shared = handler.dwell, handler.initial_dwell
+            handler.dwell, handler.initial_dwell = state["dwell"], state["initial_dwell"]
+            try:
+                hand_state, show_floor = handler.process_gesture(hands[index]["gesture"], timestamp)
+            finally:
+                handler.dwell, handler.initial_dwell = shared
+            hands[index].update(state=hand_state, show_floor=show_floor, driving=True)
+
+            event = handler.last_event
+            if event is not None:
+                self.events.append({**event, "track_id": track_id})
+                if self.arbitration == "owner":
+                    # the floor confirmation ends the selection and frees it for the next passenger
+                    self.owner = None if event["kind"] == "floor_confirmed" else track_id
+
+        # tracks that may not drive still advance their own dwell, so their progress is there once they may. A run
+        # that reaches its threshold is held there, it fires on the track's first frame as a driver
+        for index, track_id in enumerate(track_ids):
+            if not hands[index]["driving"]:
+                state = self.states[track_id]
+                dwell = state["initial_dwell"] if handler.initializing else state["dwell"]
+                dwell.update(hands[index]["gesture"], timestamp, confirm=False)
+        return hands
+
+    # true while any track is holding a gesture, for the frame rate governor. Called on every frame, with or without
+    # hands, so tracks of passengers who left are dropped and runs past their gap tolerance do not count
+    def dwell_in_progress(self, timestamp):
+        self.expire(timestamp)
+        return any(dwell.gesture is not None and not dwell.gap_exceeded(timestamp)
+                   for state in self.states.values() for dwell in (state["dwell"], state["initial_dwell"]))